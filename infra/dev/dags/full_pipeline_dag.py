@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import os
 import subprocess
 from airflow import DAG
 from airflow.operators.python import PythonOperator
@@ -12,6 +13,18 @@ default_args = {
     'retry_delay': timedelta(minutes=5),
 }
 
+# Nombre de tâches d'ingestion parallèles (elles se partagent la file via SKIP LOCKED)
+INGEST_PARALLEL_TASKS = int(os.getenv("INGEST_PARALLEL_TASKS", "1"))
+
+# Entraînement data-parallel (torchrun, backend gloo) : processus par nœud et nombre de nœuds.
+# Avec plusieurs nœuds, une tâche par nœud ; elles se retrouvent au point de rendez-vous
+# TRAIN_RDZV_ENDPOINT (hôte:port joignable par tous les workers) et lisent le même dataset.
+TRAIN_NPROC_PER_NODE = int(os.getenv("TRAIN_NPROC_PER_NODE", "1"))
+TRAIN_NNODES = int(os.getenv("TRAIN_NNODES", "1"))
+TRAIN_RDZV_ENDPOINT = os.getenv("TRAIN_RDZV_ENDPOINT", "")
+if TRAIN_NNODES > 1 and not TRAIN_RDZV_ENDPOINT:
+    raise ValueError("TRAIN_NNODES > 1 nécessite TRAIN_RDZV_ENDPOINT (hôte:port du rendez-vous)")
+
 
 def run_python_script(script_path):
     """
@@ -29,6 +42,39 @@ def run_python_script(script_path):
         raise
 
 
+def run_training_script(script_path, run_id):
+    """
+    Lance script_path avec torchrun quand l'entraînement est réparti
+    (TRAIN_NPROC_PER_NODE > 1 ou TRAIN_NNODES > 1), sinon comme les autres scripts.
+    `run_id` (run_id du DAG run) identifie le rendez-vous : les tâches d'un
+    autre run ne peuvent pas le rejoindre.
+    """
+    if TRAIN_NPROC_PER_NODE == 1 and TRAIN_NNODES == 1:
+        return run_python_script(script_path)
+    command = ["torchrun", f"--nproc_per_node={TRAIN_NPROC_PER_NODE}"]
+    if TRAIN_NNODES == 1:
+        command.append("--standalone")
+    else:
+        if not run_id:
+            raise ValueError("run_id du DAG run requis pour le rendez-vous multi-nœuds")
+        command += [
+            f"--nnodes={TRAIN_NNODES}",
+            "--rdzv-backend=c10d",
+            f"--rdzv-endpoint={TRAIN_RDZV_ENDPOINT}",
+            # Identifiant de rendez-vous commun aux tâches d'un même DAG run
+            f"--rdzv-id={run_id}",
+        ]
+    command.append(script_path)
+    try:
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        print(result.stdout)
+    except subprocess.CalledProcessError as e:
+        print(f"Error executing script: {e}")
+        print(f"Standard Output: {e.stdout}")
+        print(f"Standard Error: {e.stderr}")
+        raise
+
+
 with DAG(
     dag_id='full_pipeline',
     default_args=default_args,
@@ -62,19 +108,35 @@ with DAG(
         op_args=["/opt/airflow/scripts/insert_metadata.py"],
     )
 
-    # Tâche 4 : télécharger / uploader les images
-    download_upload_pictures_task = PythonOperator(
-        task_id='run_download_and_upload_pictures',
+    # Tâche 4 : télécharger / uploader les images (une ou plusieurs tâches en parallèle)
+    download_upload_pictures_tasks = [
+        PythonOperator(
+            task_id='run_download_and_upload_pictures' if INGEST_PARALLEL_TASKS == 1
+            else f'run_download_and_upload_pictures_{i}',
+            python_callable=run_python_script,
+            op_args=["/opt/airflow/scripts/download_and_upload_pictures.py"],
+        )
+        for i in range(INGEST_PARALLEL_TASKS)
+    ]
+
+    # Tâche 5 : matérialiser le dataset en shards locaux (lecture sans réseau)
+    materialize_dataset_task = PythonOperator(
+        task_id='run_materialize_dataset',
         python_callable=run_python_script,
-        op_args=["/opt/airflow/scripts/download_and_upload_pictures.py"],
+        op_args=["/opt/airflow/scripts/materialize_dataset.py"],
     )
 
-    # Tâche 5 : entraîner le modèle
-    train_model_task = PythonOperator(
-    task_id='train_model',
-    python_callable=run_python_script,
-    op_args=["/opt/airflow/scripts/train_model.py"],  # Ensure the correct path within the Airflow container
-    )
+    # Tâche 6 : entraîner le modèle (une tâche par nœud en multi-nœuds)
+    train_model_tasks = [
+        PythonOperator(
+            task_id='train_model' if TRAIN_NNODES == 1 else f'train_model_node_{i}',
+            python_callable=run_training_script,
+            # op_args est templaté : "{{ run_id }}" devient l'identifiant du DAG run
+            op_args=["/opt/airflow/scripts/train_model.py", "{{ run_id }}"],
+        )
+        for i in range(TRAIN_NNODES)
+    ]
 
-    # Orchestration : d'abord insérer les métadonnées, puis traiter les images
-    create_db_task >> create_table_task >> insert_metadata_task >> download_upload_pictures_task >> train_model_task 
+    # Orchestration : base et table, métadonnées, ingestion des images (en parallèle),
+    # matérialisation du dataset, puis entraînement (toutes les tâches de nœud ensemble)
+    create_db_task >> create_table_task >> insert_metadata_task >> download_upload_pictures_tasks >> materialize_dataset_task >> train_model_tasks
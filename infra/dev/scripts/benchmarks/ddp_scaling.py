@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Data-parallel scaling benchmark: launches the fine-tune step under torchrun
+(DistributedDataParallel, gloo) with 1, 2, 4, 8... processes on this node
+and reports global images/sec, speedup and efficiency against 1 process.
+
+The CPU cores are split evenly between the processes (--threads per process
+otherwise) and the per-process batch size is fixed, so the global batch grows
+with the number of processes (weak scaling). --synthetic feeds random tensors
+to measure compute + gradient all-reduce only; without it each rank reads its
+DistributedSampler shard of the real training split.
+
+Example (from infra/dev/scripts):
+    python benchmarks/ddp_scaling.py --procs 1,2,4,8 --steps 20 --synthetic
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(args):
+    """One torchrun rank; rank 0 prints 'images seconds' for the timed steps."""
+    import torch
+    import torch.distributed as dist
+
+    from ml.data_loader import available_cpus, get_dataloaders, set_epoch
+    from ml.engine import Engine, set_threads
+    from ml.model import build_model
+
+    dist.init_process_group(backend=os.getenv("DIST_BACKEND", "gloo"))
+    world_size = dist.get_world_size()
+    set_threads(args.threads or max(1, available_cpus() // world_size))
+    device = torch.device("cpu")
+
+    n_batches = args.warmup + args.steps
+    if args.synthetic:
+        generator = torch.Generator().manual_seed(dist.get_rank())
+        batches = [(torch.rand(args.batch_size, 3, 224, 224, generator=generator),
+                    torch.randint(0, 2, (args.batch_size,), generator=generator))
+                   for _ in range(n_batches)]
+    else:
+        train_loader, _ = get_dataloaders(batch_size=args.batch_size, distributed=True)
+        set_epoch(train_loader, 0)
+        batches = []
+        for imgs, labels in train_loader:
+            batches.append((imgs, labels))
+            if len(batches) >= n_batches:
+                break
+
+    model, criterion, optimizer = build_model(device=device)
+    engine = Engine(model, device, distributed=True)
+    engine.train_epoch(batches[:args.warmup], criterion, optimizer)
+    dist.barrier()
+    _, _, images, elapsed = engine.train_epoch(batches[args.warmup:], criterion, optimizer)
+    # The slowest rank sets the pace
+    elapsed_max = torch.tensor(elapsed)
+    dist.all_reduce(elapsed_max, op=dist.ReduceOp.MAX)
+    if dist.get_rank() == 0:
+        print(f"{images} {elapsed_max.item():.4f}")
+    dist.destroy_process_group()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", default="1,2,4,8")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed steps (allocator, DDP buckets)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Per-process batch size")
+    parser.add_argument("--threads", type=int, default=0, help="Threads per process (0: cores / processes)")
+    parser.add_argument("--synthetic", action="store_true", help="Random tensors instead of the training split")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    baseline = None
+    for nproc in (int(p) for p in args.procs.split(",") if p):
+        command = [
+            sys.executable, "-m", "torch.distributed.run", "--standalone", f"--nproc_per_node={nproc}",
+            __file__, "--worker", "--steps", str(args.steps), "--warmup", str(args.warmup),
+            "--batch-size", str(args.batch_size), "--threads", str(args.threads),
+        ]
+        if args.synthetic:
+            command.append("--synthetic")
+        out = subprocess.run(command, check=True, capture_output=True, text=True).stdout.split()
+        images, elapsed = int(out[-2]), float(out[-1])
+        throughput = images / elapsed
+        baseline = baseline or throughput / nproc
+        speedup = throughput / baseline
+        print(
+            f"{nproc:>2} procs  {throughput:8.1f} img/s  speedup {speedup:5.2f}x  "
+            f"efficiency {speedup / nproc:6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Epoch-time benchmark: one full pass over the training loader, reading images
+either over the network (PlantDataset, url_source), from the local shards
+written by materialize_dataset.py (ShardDataset), or from the pre-decoded
+memory-mapped tensor store (TensorStoreDataset). With --train, each batch
+also goes through a forward/backward pass so the whole epoch is timed.
+
+Example (from infra/dev/scripts):
+    python benchmarks/epoch_time.py --source all --train
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.data_loader import DATASET_DIR, TENSOR_STORE_DIR, get_dataloaders  # noqa: E402
+from ml.model import build_model  # noqa: E402
+
+
+def run_epoch(loader, train):
+    model = criterion = optimizer = None
+    if train:
+        model, criterion, optimizer = build_model()
+        model.train()
+    images = 0
+    started = time.perf_counter()
+    for imgs, labels in loader:
+        if train:
+            optimizer.zero_grad()
+            loss = criterion(model(imgs), labels)
+            loss.backward()
+            optimizer.step()
+        images += imgs.size(0)
+    return images, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["network", "local", "tensors", "all"], default="all")
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--store-dir", default=TENSOR_STORE_DIR)
+    parser.add_argument("--train", action="store_true", help="Include forward/backward in the timing")
+    args = parser.parse_args()
+
+    sources = ["network", "local", "tensors"] if args.source == "all" else [args.source]
+    for source in sources:
+        dataset_dir = args.dataset_dir if source in ("local", "tensors") else None
+        store_dir = args.store_dir if source == "tensors" else None
+        train_loader, _ = get_dataloaders(dataset_dir=dataset_dir, store_dir=store_dir)
+        images, elapsed = run_epoch(train_loader, args.train)
+        print(f"{source:<8} {images} images in {elapsed:.1f}s ({images / elapsed:.1f} img/s)")
+
+
+if __name__ == "__main__":
+    main()
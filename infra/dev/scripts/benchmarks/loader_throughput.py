@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Loader-throughput benchmark: iterates the training DataLoader without any
+model, for each requested worker count, and reports images/sec and the time
+to the first batch. If this is not well above the training throughput, the
+training loop is input-bound.
+
+Example (from infra/dev/scripts):
+    python benchmarks/loader_throughput.py --workers 0,2,4,8 --batches 100
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.data_loader import (  # noqa: E402
+    BATCH_SIZE, DATASET_DIR, LOADER_PREFETCH_FACTOR, TENSOR_STORE_DIR, available_cpus, get_dataloaders,
+)
+
+
+def measure(loader, max_batches):
+    images = 0
+    first_batch_s = None
+    started = time.perf_counter()
+    for i, (imgs, _) in enumerate(loader):
+        if first_batch_s is None:
+            first_batch_s = time.perf_counter() - started
+        images += imgs.size(0)
+        if max_batches and i + 1 >= max_batches:
+            break
+    return images, time.perf_counter() - started, first_batch_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"0,{available_cpus() - 1}",
+                        help="Comma-separated worker counts to compare")
+    parser.add_argument("--batches", type=int, default=50, help="Batches per run (0 = full epoch)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--prefetch-factor", type=int, default=LOADER_PREFETCH_FACTOR)
+    parser.add_argument("--dataset-dir", default=DATASET_DIR, help="Empty to read over the network")
+    parser.add_argument("--store-dir", default=TENSOR_STORE_DIR, help="Empty to skip the tensor store")
+    args = parser.parse_args()
+
+    for workers in sorted({max(0, int(w)) for w in args.workers.split(",") if w}):
+        train_loader, _ = get_dataloaders(
+            batch_size=args.batch_size,
+            dataset_dir=args.dataset_dir or None,
+            store_dir=args.store_dir or None,
+            loader_config={"num_workers": workers, "prefetch_factor": args.prefetch_factor},
+        )
+        images, elapsed, first_batch_s = measure(train_loader, args.batches)
+        print(
+            f"workers={workers:<3} {type(train_loader.dataset).__name__:<18} {images} images "
+            f"in {elapsed:.1f}s ({images / elapsed:.1f} img/s, first batch {first_batch_s:.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Training-throughput benchmark: runs a few optimizer steps of the fine-tune
+loop for each engine configuration (baseline, channels_last, bf16, compile,
+all) on the same batches and reports images/sec. With --mlflow, each
+configuration is logged as its own MLflow run (engine_* params,
+train_images_per_s metric) so configurations can be compared in the UI.
+
+Batches are read once up front, so the numbers measure compute only.
+
+Example (from infra/dev/scripts):
+    python benchmarks/train_throughput.py --steps 20 --threads 16 --mlflow
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import torch  # noqa: E402
+
+from ml.data_loader import BATCH_SIZE, get_dataloaders  # noqa: E402
+from ml.engine import Engine, set_threads  # noqa: E402
+from ml.model import build_model  # noqa: E402
+
+CONFIGS = {
+    "baseline": {},
+    "channels_last": {"channels_last": True},
+    "bf16": {"bf16": True},
+    "compile": {"compile": True},
+    "all": {"channels_last": True, "bf16": True, "compile": True},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed steps (compilation, allocator)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--interop-threads", type=int, default=0)
+    parser.add_argument("--mlflow", action="store_true", help="Log each configuration as an MLflow run")
+    args = parser.parse_args()
+
+    intra_op, inter_op = set_threads(args.threads, args.interop_threads)
+    device = torch.device("cpu")
+    train_loader, _ = get_dataloaders(batch_size=args.batch_size)
+    batches = []
+    for imgs, labels in train_loader:
+        batches.append((imgs, labels))
+        if len(batches) >= args.warmup + args.steps:
+            break
+
+    if args.mlflow:
+        import mlflow
+        mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI"))
+        mlflow.set_experiment(os.getenv("MLFLOW_EXPERIMENT", "my_training_experiment") + "-benchmarks")
+
+    for name in args.configs.split(","):
+        model, criterion, optimizer = build_model(device=device)
+        engine = Engine(model, device, **CONFIGS[name])
+        engine.train_epoch(batches[:args.warmup], criterion, optimizer)
+        _, _, images, elapsed = engine.train_epoch(batches[args.warmup:], criterion, optimizer)
+        throughput = images / elapsed
+        print(f"{name:<14} {throughput:8.1f} img/s  {engine.flags()}")
+
+        if args.mlflow:
+            with mlflow.start_run(run_name=f"train_throughput_{name}"):
+                mlflow.log_params({f"engine_{k}": v for k, v in engine.flags().items()})
+                mlflow.log_params({"batch_size": args.batch_size, "num_threads": intra_op,
+                                   "interop_threads": inter_op})
+                mlflow.log_metric("train_images_per_s", throughput)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Peak-RSS benchmark for picture ingestion: serves synthetic objects of
+increasing size from a local HTTP server and pushes each one to MinIO
+through transfer_picture (streaming multipart path) or a whole-body
+buffered put_object, each size in a fresh subprocess. With streaming, the
+peak RSS should stay flat whatever the object size.
+
+Needs the same S3 environment as download_and_upload_pictures.py
+(MLFLOW_S3_ENDPOINT_URL, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, BUCKET_NAME).
+
+Example (from infra/dev/scripts):
+    python benchmarks/upload_rss.py --sizes-mb 8,64,256,1024 --mode both
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 1024 * 1024
+
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    """GET /<n_bytes>/<name>.bin -> n_bytes of random data, streamed."""
+
+    def do_GET(self):
+        size = int(self.path.strip("/").split("/")[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        remaining = size
+        while remaining:
+            n = min(CHUNK, remaining)
+            self.wfile.write(os.urandom(n))
+            remaining -= n
+
+    def log_message(self, *args):
+        pass
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(url, mode):
+    """Runs one transfer and prints 'seconds peak_rss_mb'."""
+    import download_and_upload_pictures as ingest
+
+    s3 = ingest.get_s3_client()
+    ingest.ensure_bucket_exists(s3)
+    started = time.perf_counter()
+    if mode == "stream":
+        url_s3, _, _ = ingest.transfer_picture(s3, set(), url)
+        key = url_s3.split(f"/{ingest.bucket_name}/", 1)[1]
+    else:
+        data = ingest.get_http_session().get(url, timeout=600).content
+        key = f"{ingest.incoming_prefix}/bench-buffered"
+        s3.put_object(Bucket=ingest.bucket_name, Key=key, Body=data)
+    elapsed = time.perf_counter() - started
+    s3.delete_object(Bucket=ingest.bucket_name, Key=key)
+    print(f"{elapsed:.3f} {peak_rss_mb():.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", default="8,64,256,1024")
+    parser.add_argument("--mode", choices=["stream", "buffer", "both"], default="both")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--child-url", help=argparse.SUPPRESS)
+    parser.add_argument("--child-mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_url:
+        child(args.child_url, args.child_mode)
+        return
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), SyntheticHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    modes = ["stream", "buffer"] if args.mode == "both" else [args.mode]
+    try:
+        for size_mb in (int(s) for s in args.sizes_mb.split(",") if s):
+            for mode in modes:
+                url = f"http://127.0.0.1:{args.port}/{size_mb * CHUNK}/object-{size_mb}.bin"
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child-url", url, "--child-mode", mode],
+                    check=True, capture_output=True, text=True,
+                ).stdout.split()
+                elapsed, rss = float(out[-2]), float(out[-1])
+                print(
+                    f"{mode:<7} {size_mb:>6} MB  {elapsed:7.2f}s  {size_mb / elapsed:7.1f} MB/s  "
+                    f"peak RSS {rss:7.1f} MB"
+                )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,10 @@ import sys
 import os
 import logging
 from dotenv import load_dotenv
-import psycopg2
 from pathlib import Path
 
+from data_access import connect, log_query_stats
+
 
 
 # ─── CHARGEMENT DU .env ─────────────────────────────────────────
@@ -22,10 +23,6 @@ logger = logging.getLogger(__name__)
 # ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
 airflow_db   = os.getenv("AIRFLOW_DB_NAME")
 target_db    = os.getenv("TARGET_DB_NAME")
-db_user      = os.getenv("DB_USER")
-db_password  = os.getenv("DB_PASSWORD")
-db_host      = os.getenv("DB_HOST")
-db_port      = os.getenv("DB_PORT")
 
 def create_mlops_db():
     """
@@ -33,21 +30,14 @@ def create_mlops_db():
     si elle n'existe pas.
     """
     # Connexion à la base de maintenance
+    # (autocommit pour la création de la nouvelle base)
     try:
-        conn = psycopg2.connect(
-            dbname=airflow_db,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
+        conn = connect(airflow_db, autocommit=True)
         logger.info(f"Connexion à la base '{airflow_db}' réussie")
     except Exception as e:
         logger.error(f"Impossible de se connecter à la base '{airflow_db}'", exc_info=e)
         sys.exit(1)
 
-    # Activer autocommit pour la création de la nouvelle base
-    conn.autocommit = True
     cur = conn.cursor()
 
     # Vérifier l'existence de la base target_db
@@ -71,6 +61,7 @@ def create_mlops_db():
     # Fermeture des connexions
     cur.close()
     conn.close()
+    log_query_stats()
     logger.info("Opération terminée")
 
 if __name__ == "__main__":
@@ -3,7 +3,8 @@ import sys
 import os
 import logging
 from dotenv import load_dotenv
-import psycopg2
+
+from data_access import db_connection, log_query_stats
 
 # ─── CHARGEMENT DU .env ─────────────────────────────────────────
 load_dotenv()
@@ -17,10 +18,6 @@ logger = logging.getLogger(__name__)
 
 # ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
 target_db   = os.getenv("TARGET_DB_NAME")
-db_user      = os.getenv("DB_USER")
-db_password  = os.getenv("DB_PASSWORD")
-db_host      = os.getenv("DB_HOST")
-db_port      = os.getenv("DB_PORT")
 
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS plants_data (
@@ -31,40 +28,38 @@ CREATE TABLE IF NOT EXISTS plants_data (
 );
 """
 
+# Suivi de l'ingestion (idempotent, applicable à une table existante)
+INGESTION_COLUMNS_SQL = """
+ALTER TABLE plants_data
+    ADD COLUMN IF NOT EXISTS status     VARCHAR(20) NOT NULL DEFAULT 'pending',
+    ADD COLUMN IF NOT EXISTS attempts   INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_error TEXT,
+    ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+    ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+UPDATE plants_data SET status = 'done' WHERE url_s3 IS NOT NULL AND status <> 'done';
+CREATE INDEX IF NOT EXISTS plants_data_status_id_idx ON plants_data (status, id);
+-- Un même contenu (SHA-256) n'est référencé qu'une fois
+CREATE UNIQUE INDEX IF NOT EXISTS plants_data_content_hash_idx ON plants_data (content_hash);
+"""
+
 def create_plants_table():
     """
     Connecte à la base target_db et crée la table plants_data si elle n'existe pas.
     """
-    conn = None
-    cur = None
-
-    # Connexion à la base
-    try:
-        conn = psycopg2.connect(
-            dbname=target_db,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        logger.info(f"Connexion à la base '{target_db}' réussie.")
-    except Exception as e:
-        logger.error(f"Erreur de connexion à la base '{target_db}'", exc_info=e)
-        sys.exit(1)
-
     try:
-        cur = conn.cursor()
-        cur.execute(CREATE_TABLE_SQL)
-        conn.commit()
-        logger.info(f"Table 'plants_data' créée ou déjà existante dans '{target_db}'.")
+        with db_connection() as conn:
+            logger.info(f"Connexion à la base '{target_db}' réussie.")
+            with conn.cursor() as cur:
+                cur.execute(CREATE_TABLE_SQL)
+                cur.execute(INGESTION_COLUMNS_SQL)
+            conn.commit()
+            logger.info(f"Table 'plants_data' créée ou déjà existante dans '{target_db}'.")
     except Exception as e:
         logger.error("Erreur lors de la création de la table 'plants_data'", exc_info=e)
         sys.exit(1)
     finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+        log_query_stats()
         logger.info("Fermeture de la connexion à la base")
 
 if __name__ == "__main__":
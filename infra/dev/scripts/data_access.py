@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Accès partagé à Postgres et à Minio/S3 pour les scripts d'infra et le
+chargement des données d'entraînement :
+
+- pool de connexions psycopg2 (par processus), connexions avec timeouts et
+  nouvelles tentatives, durée de chaque requête mesurée ;
+- client boto3 unique, thread-safe, avec pool de connexions, retries et
+  timeouts homogènes.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+import boto3
+from botocore.client import Config
+
+# ─── CHARGEMENT DU .env ─────────────────────────────────────────
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
+# Base de données
+target_db   = os.getenv("TARGET_DB_NAME")
+db_user     = os.getenv("DB_USER")
+db_password = os.getenv("DB_PASSWORD")
+db_host     = os.getenv("DB_HOST")
+db_port     = os.getenv("DB_PORT")
+
+db_pool_min          = int(os.getenv("DB_POOL_MIN", "1"))
+db_pool_max          = int(os.getenv("DB_POOL_MAX", "8"))
+db_connect_timeout   = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+db_connect_retries   = int(os.getenv("DB_CONNECT_RETRIES", "5"))
+# 0 = pas de limite côté serveur
+db_statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Requêtes plus lentes journalisées en WARNING
+db_slow_query_ms     = float(os.getenv("DB_SLOW_QUERY_MS", "1000"))
+
+# Minio / S3
+s3_endpoint = os.getenv("MLFLOW_S3_ENDPOINT_URL")
+aws_key     = os.getenv("AWS_ACCESS_KEY_ID")
+aws_secret  = os.getenv("AWS_SECRET_ACCESS_KEY")
+aws_region  = os.getenv("AWS_REGION", "us-east-1")
+
+s3_max_pool_connections = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+s3_max_attempts         = int(os.getenv("S3_MAX_ATTEMPTS", "5"))
+s3_connect_timeout      = float(os.getenv("S3_CONNECT_TIMEOUT", "10"))
+s3_read_timeout         = float(os.getenv("S3_READ_TIMEOUT", "60"))
+
+
+# ─── INSTRUMENTATION DES REQUÊTES ─────────────────────────────
+class QueryStats:
+    """Nombre de requêtes et temps cumulé, par processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, elapsed):
+        with self._lock:
+            self.count += 1
+            self.total_s += elapsed
+            self.max_s = max(self.max_s, elapsed)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "queries": self.count,
+                "total_s": round(self.total_s, 3),
+                "avg_ms": round(1000 * self.total_s / self.count, 3) if self.count else 0.0,
+                "max_ms": round(1000 * self.max_s, 3),
+            }
+
+
+query_stats = QueryStats()
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Curseur mesurant la durée de chaque execute / executemany."""
+
+    def _timed(self, method, query, args):
+        started = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            query_stats.record(elapsed)
+            if elapsed * 1000 >= db_slow_query_ms:
+                text = query.decode() if isinstance(query, bytes) else str(query)
+                logger.warning(f"Requête lente ({elapsed * 1000:.0f} ms) : {' '.join(text.split())[:200]}")
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Requête en {elapsed * 1000:.1f} ms ({self.rowcount} lignes)")
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+
+def log_query_stats():
+    stats = query_stats.summary()
+    logger.info(
+        f"BDD : {stats['queries']} requêtes, {stats['total_s']:.2f}s au total "
+        f"(moyenne {stats['avg_ms']:.1f} ms, max {stats['max_ms']:.1f} ms)"
+    )
+
+
+# ─── POSTGRES ─────────────────────────────────────────────────
+def _connect_kwargs(dbname):
+    kwargs = {
+        "dbname": dbname or target_db,
+        "user": db_user,
+        "password": db_password,
+        "host": db_host,
+        "port": db_port,
+        "connect_timeout": db_connect_timeout,
+        "cursor_factory": TimedCursor,
+        "application_name": os.path.basename(sys.argv[0] or "") or "mlops-scripts",
+    }
+    if db_statement_timeout:
+        kwargs["options"] = f"-c statement_timeout={db_statement_timeout}"
+    return kwargs
+
+
+def _retry(fn, what):
+    for attempt in range(1, db_connect_retries + 1):
+        try:
+            return fn()
+        except psycopg2.OperationalError as e:
+            if attempt == db_connect_retries:
+                raise
+            delay = min(30, 2 ** (attempt - 1))
+            logger.warning(f"{what} impossible (tentative {attempt}/{db_connect_retries}), nouvel essai dans {delay}s : {e}")
+            time.sleep(delay)
+
+
+def connect(dbname=None, autocommit=False):
+    """
+    Connexion directe (hors pool), pour les opérations ponctuelles comme
+    CREATE DATABASE sur la base de maintenance.
+    """
+    conn = _retry(lambda: psycopg2.connect(**_connect_kwargs(dbname)), f"Connexion à '{dbname or target_db}'")
+    conn.autocommit = autocommit
+    return conn
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Pool de connexions vers target_db, créé à la première utilisation.
+    Un pool par processus : les workers DataLoader forkés ne réutilisent
+    jamais les sockets du parent.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = _retry(
+                lambda: ThreadedConnectionPool(db_pool_min, db_pool_max, **_connect_kwargs(target_db)),
+                f"Pool de connexions vers '{target_db}'",
+            )
+            _pool_pid = os.getpid()
+            logger.info(f"Pool de connexions vers '{target_db}' initialisé ({db_pool_min}-{db_pool_max})")
+        return _pool
+
+
+@contextmanager
+def db_connection():
+    """
+    Emprunte une connexion au pool (autocommit désactivé). Toute transaction
+    non commitée est annulée au retour dans le pool ; une connexion cassée
+    est fermée plutôt que réutilisée.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if not broken and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+
+# ─── S3 / MINIO ───────────────────────────────────────────────
+_s3_client = None
+_s3_pid = None
+_s3_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Client boto3 partagé (thread-safe) pour Minio/S3, créé à la première
+    utilisation, un par processus.
+    """
+    global _s3_client, _s3_pid
+    with _s3_lock:
+        if _s3_client is None or _s3_pid != os.getpid():
+            _s3_client = boto3.client(
+                's3',
+                endpoint_url=s3_endpoint,
+                aws_access_key_id=aws_key,
+                aws_secret_access_key=aws_secret,
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=s3_max_pool_connections,
+                    retries={"max_attempts": s3_max_attempts, "mode": "standard"},
+                    connect_timeout=s3_connect_timeout,
+                    read_timeout=s3_read_timeout,
+                ),
+                region_name=aws_region
+            )
+            _s3_pid = os.getpid()
+            logger.info("Client S3 initialisé")
+        return _s3_client
@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
+import io
 import sys
 import os
+import time
 import logging
+import socket
+import uuid
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 import psycopg2
+import psycopg2.errors
+from psycopg2.extras import execute_values
 import requests
-import boto3
-from botocore.client import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
+from data_access import db_connection, get_s3_client, log_query_stats, s3_endpoint, s3_max_pool_connections
+
 # ─── CHARGEMENT DU .env ─────────────────────────────────────────
 load_dotenv()
 
@@ -22,56 +35,106 @@ logger = logging.getLogger(__name__)
 # ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
 # Base de données
 target_db   = os.getenv("TARGET_DB_NAME")
-db_user     = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-db_host     = os.getenv("DB_HOST")
-db_port     = os.getenv("DB_PORT")
-
-# Minio / S3
-s3_endpoint = os.getenv("MLFLOW_S3_ENDPOINT_URL")
-aws_key     = os.getenv("AWS_ACCESS_KEY_ID")
-aws_secret  = os.getenv("AWS_SECRET_ACCESS_KEY")
+
+# Minio / S3 (client partagé : data_access)
 bucket_name = os.getenv("BUCKET_NAME", "images")
 
-def get_db_connection():
-    """
-    Retourne une connexion psycopg2 configurée pour la base target_db.
-    """
-    try:
-        conn = psycopg2.connect(
-            dbname=target_db,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        conn.autocommit = False
-        logger.info(f"Connecté à la base '{target_db}'")
-        return conn
-    except Exception as e:
-        logger.error(f"Échec de connexion à la base '{target_db}'", exc_info=e)
-        sys.exit(1)
+# Ingestion concurrente
+concurrency      = int(os.getenv("INGEST_CONCURRENCY", "16"))
+http_timeout     = float(os.getenv("INGEST_HTTP_TIMEOUT", "10"))
+http_retries     = int(os.getenv("INGEST_HTTP_RETRIES", "3"))
+progress_every_s = float(os.getenv("INGEST_PROGRESS_EVERY_S", "10"))
 
+# Écriture groupée des url_s3 : une transaction par lot de N lignes ou toutes les T secondes
+db_flush_rows    = int(os.getenv("INGEST_DB_FLUSH_ROWS", "500"))
+db_flush_every_s = float(os.getenv("INGEST_DB_FLUSH_EVERY_S", "5"))
 
-def get_s3_client():
-    """
-    Retourne un client boto3 configuré pour Minio/S3.
-    """
-    try:
-        client = boto3.client(
-            's3',
-            endpoint_url=s3_endpoint,
-            aws_access_key_id=aws_key,
-            aws_secret_access_key=aws_secret,
-            config=Config(signature_version='s3v4'),
-            region_name=os.getenv("AWS_REGION", "us-east-1")
-        )
-        logger.info("Client S3 initialisé")
-        return client
-    except Exception as e:
-        logger.error("Échec de l'initialisation du client S3", exc_info=e)
-        sys.exit(1)
+# Les objets sont stockés par contenu : `{prefix}/{sha256[:2]}/{sha256}{ext}`
+content_prefix = os.getenv("INGEST_CONTENT_PREFIX", "sha256")
+download_chunk_size = int(os.getenv("INGEST_CHUNK_SIZE", str(256 * 1024)))
+
+# Transferts en flux : au-delà de `INGEST_STREAM_THRESHOLD` octets (ou taille
+# inconnue), la réponse HTTP est envoyée en multipart sans jamais être
+# chargée entière ; la mémoire par transfert est bornée par
+# part_size × INGEST_PART_CONCURRENCY.
+MB = 1024 * 1024
+stream_threshold = int(os.getenv("INGEST_STREAM_THRESHOLD", str(8 * MB)))
+incoming_prefix  = os.getenv("INGEST_INCOMING_PREFIX", "incoming")
+transfer_config  = TransferConfig(
+    multipart_threshold=stream_threshold,
+    multipart_chunksize=int(os.getenv("INGEST_PART_SIZE", str(8 * MB))),
+    max_concurrency=int(os.getenv("INGEST_PART_CONCURRENCY", "2")),
+    use_threads=True,
+)
+
+# Une image dont le contenu est déjà référencé par une autre ligne n'est pas écrite
+UPDATE_URL_S3_SQL = """
+UPDATE plants_data AS p
+SET url_s3 = v.url_s3, content_hash = v.content_hash, status = 'done', last_error = NULL
+FROM (VALUES %s) AS v(id, url_s3, content_hash)
+WHERE p.id = v.id
+  AND NOT EXISTS (
+      SELECT 1 FROM plants_data q WHERE q.content_hash = v.content_hash AND q.id <> v.id
+  )
+RETURNING p.id
+"""
+
+MARK_DUPLICATE_SQL = """
+UPDATE plants_data AS p SET status = 'duplicate', last_error = v.last_error
+FROM (VALUES %s) AS v(id, last_error)
+WHERE p.id = v.id
+"""
+
+MARK_FAILED_SQL = """
+UPDATE plants_data AS p SET status = 'failed', last_error = v.last_error
+FROM (VALUES %s) AS v(id, last_error)
+WHERE p.id = v.id
+"""
+
+# Répartition du travail entre plusieurs workers (tâches Airflow, pods)
+worker_id        = os.getenv("INGEST_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+claim_size       = int(os.getenv("INGEST_CLAIM_SIZE", "200"))
+max_attempts     = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# Une réservation plus ancienne est considérée abandonnée (worker crashé)
+claim_timeout_s  = int(os.getenv("INGEST_CLAIM_TIMEOUT_S", "900"))
+
+# Lot suivant, verrouillé sans attendre les lignes déjà prises par un autre worker
+CLAIM_SQL = """
+UPDATE plants_data SET status = 'in_progress', attempts = attempts + 1,
+                       claimed_by = %(worker)s, claimed_at = now()
+WHERE id IN (
+    SELECT id FROM plants_data
+    WHERE url_s3 IS NULL
+      AND (status = 'pending'
+           OR (status = 'failed' AND attempts < %(max_attempts)s)
+           OR (status = 'in_progress' AND attempts < %(max_attempts)s
+               AND claimed_at < now() - make_interval(secs => %(timeout)s)))
+    ORDER BY id
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, url_source
+"""
+
+# Réservations expirées sans tentative restante (le worker a crashé ou bloqué à chaque fois)
+EXPIRE_CLAIMS_SQL = """
+UPDATE plants_data
+SET status = 'failed',
+    last_error = 'Réservation expirée après ' || attempts || ' tentatives (worker ' || claimed_by || ')'
+WHERE url_s3 IS NULL
+  AND status = 'in_progress'
+  AND attempts >= %(max_attempts)s
+  AND claimed_at < now() - make_interval(secs => %(timeout)s)
+"""
 
+REMAINING_SQL = """
+SELECT count(*) FROM plants_data
+WHERE url_s3 IS NULL
+  AND (status IN ('pending', 'in_progress') OR (status = 'failed' AND attempts < %s))
+"""
+
+# Une session HTTP (keep-alive) par thread du pool
+_thread_local = threading.local()
 
 def ensure_bucket_exists(s3):
     """
@@ -94,68 +157,411 @@ def ensure_bucket_exists(s3):
             sys.exit(1)
 
 
+def get_http_session():
+    """
+    Retourne la session HTTP du thread courant (connexions réutilisées,
+    retry avec backoff exponentiel sur les erreurs transitoires).
+    """
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        retry = Retry(
+            total=http_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _thread_local.session = session
+    return session
+
+
+def content_key(digest, url_source):
+    """
+    Clé S3 adressée par contenu : deux sources identiques partagent l'objet,
+    deux fichiers homonymes de sources différentes ne se marchent plus dessus.
+    """
+    ext = os.path.splitext(os.path.basename(url_source))[1].lower() or ".jpg"
+    return f"{content_prefix}/{digest[:2]}/{digest}{ext}"
+
+
+def list_existing_keys(s3):
+    """
+    Inventaire unique (list_objects_v2) des objets déjà présents sous le
+    préfixe de contenu : remplace un head_object par image.
+    """
+    keys = set()
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=f"{content_prefix}/"):
+        keys.update(obj["Key"] for obj in page.get("Contents", []))
+    logger.info(f"{len(keys)} objets déjà présents dans '{bucket_name}/{content_prefix}/'")
+    return keys
+
+
+class HashingReader:
+    """
+    Objet fichier en lecture seule au-dessus d'un flux : calcule le SHA-256
+    et compte les octets au fur et à mesure que boto3 lit les parts.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self._raw.read(size)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+
+def upload_buffered(s3, existing_keys, resp, url_source):
+    """
+    Petite image de taille connue : lue en mémoire (≤ stream_threshold),
+    hachée puis uploadée en un seul put_object.
+    """
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    for chunk in resp.iter_content(chunk_size=download_chunk_size):
+        digest.update(chunk)
+        buffer.write(chunk)
+    content_hash = digest.hexdigest()
+    key = content_key(content_hash, url_source)
+
+    if key in existing_keys:
+        logger.debug(f"Objet '{key}' existe déjà")
+    else:
+        s3.put_object(Bucket=bucket_name, Key=key, Body=buffer.getvalue())
+        existing_keys.add(key)
+        logger.debug(f"Upload de '{key}' réussi")
+    return key, content_hash, buffer.tell()
+
+
+def upload_streaming(s3, existing_keys, resp, url_source):
+    """
+    Grande image (ou taille inconnue) : la réponse est transmise en multipart
+    vers une clé temporaire pendant le téléchargement, puis copiée côté
+    serveur vers sa clé de contenu, connue seulement à la fin du flux.
+    """
+    resp.raw.decode_content = True
+    reader = HashingReader(resp.raw)
+    tmp_key = f"{incoming_prefix}/{uuid.uuid4().hex}"
+    s3.upload_fileobj(reader, bucket_name, tmp_key, Config=transfer_config)
+    try:
+        content_hash = reader.digest.hexdigest()
+        key = content_key(content_hash, url_source)
+        if key in existing_keys:
+            logger.debug(f"Objet '{key}' existe déjà")
+        else:
+            s3.copy(
+                {"Bucket": bucket_name, "Key": tmp_key}, bucket_name, key, Config=transfer_config
+            )
+            existing_keys.add(key)
+            logger.debug(f"Upload en flux de '{key}' réussi ({reader.size} octets)")
+    finally:
+        s3.delete_object(Bucket=bucket_name, Key=tmp_key)
+    return key, content_hash, reader.size
+
+
+def transfer_picture(s3, existing_keys, url_source):
+    """
+    Télécharge une image en calculant son SHA-256 au fil du flux, puis
+    l'uploade dans S3 sous sa clé de contenu si elle n'y est pas déjà.
+    Exécuté dans le pool de threads. Retourne (url_s3, sha256, nombre d'octets).
+    """
+    with get_http_session().get(url_source, timeout=http_timeout, stream=True) as resp:
+        resp.raise_for_status()
+        length = resp.headers.get("Content-Length")
+        if length is not None and int(length) <= stream_threshold:
+            key, content_hash, size = upload_buffered(s3, existing_keys, resp, url_source)
+        else:
+            key, content_hash, size = upload_streaming(s3, existing_keys, resp, url_source)
+    return f"{s3_endpoint}/{bucket_name}/{key}", content_hash, size
+
+
+class Progress:
+    """
+    Compteurs d'ingestion et rapport périodique de débit.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.ok = 0
+        self.failed = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def done(self, nbytes=0, ok=True):
+        if ok:
+            self.ok += 1
+            self.bytes += nbytes
+        else:
+            self.failed += 1
+        now = time.perf_counter()
+        if now - self._last_report >= progress_every_s:
+            self._last_report = now
+            self.report()
+
+    def report(self, final=False):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        processed = self.ok + self.failed
+        prefix = "Terminé" if final else "Progression"
+        logger.info(
+            f"{prefix} : {processed}/{self.total} images ({self.ok} ok, {self.failed} en erreur) "
+            f"en {elapsed:.1f}s — {processed / elapsed:.1f} img/s, {self.bytes / elapsed / 1e6:.2f} Mo/s"
+        )
+
+
+class UrlS3Writer:
+    """
+    Tampon des résultats (id, url_s3, content_hash), vidé en un seul
+    `UPDATE ... FROM (VALUES ...)` tous les `flush_rows` résultats ou toutes
+    les `flush_every_s` secondes. Si le lot échoue, il est rejoué ligne par
+    ligne sous savepoint : les lignes valides sont tout de même commitées.
+    Les échecs de transfert (status 'failed', last_error) et les doublons de
+    contenu (status 'duplicate') sont enregistrés de même.
+    """
+
+    def __init__(self, conn, flush_rows=db_flush_rows, flush_every_s=db_flush_every_s):
+        self.conn = conn
+        self.flush_rows = flush_rows
+        self.flush_every_s = flush_every_s
+        self.buffer = []
+        self.errors = []
+        self.duplicates = []
+        self.written = 0
+        self.failed = 0
+        self.duplicated = 0
+        self._last_flush = time.perf_counter()
+
+    def _size(self):
+        return len(self.buffer) + len(self.errors) + len(self.duplicates)
+
+    def add(self, record_id, url_s3, content_hash):
+        self.buffer.append((record_id, url_s3, content_hash))
+        if self._size() >= self.flush_rows:
+            self.flush()
+
+    def fail(self, record_id, error):
+        self.errors.append((record_id, str(error)[:1000]))
+        if self._size() >= self.flush_rows:
+            self.flush()
+
+    def flush_if_due(self):
+        if self._size() and time.perf_counter() - self._last_flush >= self.flush_every_s:
+            self.flush()
+
+    def _duplicate(self, record_id, content_hash):
+        self.duplicates.append((record_id, f"contenu {content_hash} déjà ingéré"))
+        self.duplicated += 1
+
+    def flush(self):
+        self._last_flush = time.perf_counter()
+        if self.buffer:
+            batch, self.buffer = self.buffer, []
+            # Une seule ligne par contenu dans le lot : les suivantes sont des doublons
+            unique, seen = [], set()
+            for record_id, url_s3, content_hash in batch:
+                if content_hash in seen:
+                    self._duplicate(record_id, content_hash)
+                else:
+                    seen.add(content_hash)
+                    unique.append((record_id, url_s3, content_hash))
+
+            cur = self.conn.cursor()
+            try:
+                updated = execute_values(cur, UPDATE_URL_S3_SQL, unique, page_size=len(unique), fetch=True)
+                self.conn.commit()
+                updated_ids = {row[0] for row in updated}
+                self.written += len(updated_ids)
+                for record_id, _, content_hash in unique:
+                    if record_id not in updated_ids:
+                        self._duplicate(record_id, content_hash)
+                logger.debug(f"{len(updated_ids)} url_s3 écrites en BDD")
+            except Exception as e:
+                self.conn.rollback()
+                logger.warning(f"Échec de l'update groupé ({len(unique)} lignes), reprise ligne par ligne", exc_info=e)
+                self._flush_rows(cur, unique)
+            finally:
+                cur.close()
+        # Après les url_s3 : la reprise ligne par ligne peut ajouter des échecs
+        if self.errors:
+            self.errors = self._mark(MARK_FAILED_SQL, self.errors, "échecs")
+        if self.duplicates:
+            self.duplicates = self._mark(MARK_DUPLICATE_SQL, self.duplicates, "doublons")
+
+    def _mark(self, sql, rows, what):
+        cur = self.conn.cursor()
+        try:
+            execute_values(cur, sql, rows, page_size=len(rows))
+            self.conn.commit()
+        except Exception as e:
+            # Les lignes restent 'in_progress' et seront reprises après expiration
+            self.conn.rollback()
+            logger.error(f"Impossible d'enregistrer {len(rows)} {what} en BDD", exc_info=e)
+        finally:
+            cur.close()
+        return []
+
+    def _flush_rows(self, cur, batch):
+        for record_id, url_s3, content_hash in batch:
+            cur.execute("SAVEPOINT row_update")
+            try:
+                updated = execute_values(
+                    cur, UPDATE_URL_S3_SQL, [(record_id, url_s3, content_hash)], fetch=True
+                )
+                cur.execute("RELEASE SAVEPOINT row_update")
+                if updated:
+                    self.written += 1
+                else:
+                    self._duplicate(record_id, content_hash)
+            except psycopg2.errors.UniqueViolation:
+                # Même contenu écrit au même moment par un autre worker
+                cur.execute("ROLLBACK TO SAVEPOINT row_update")
+                self._duplicate(record_id, content_hash)
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT row_update")
+                self.failed += 1
+                logger.error(f"Erreur update BDD id={record_id} url_s3={url_s3}", exc_info=e)
+                self.errors.append((record_id, str(e)[:1000]))
+        self.conn.commit()
+
+
+def claim_batch(conn, limit):
+    """
+    Réserve jusqu'à `limit` lignes à traiter pour ce worker (FOR UPDATE SKIP
+    LOCKED) et commite aussitôt la réservation. Les réservations expirées qui
+    ont épuisé leurs INGEST_MAX_ATTEMPTS tentatives passent en 'failed'.
+    Retourne les lignes réservées.
+    """
+    params = {
+        "worker": worker_id,
+        "max_attempts": max_attempts,
+        "timeout": claim_timeout_s,
+        "limit": limit,
+    }
+    cur = conn.cursor()
+    try:
+        cur.execute(EXPIRE_CLAIMS_SQL, params)
+        if cur.rowcount:
+            logger.warning(f"{cur.rowcount} réservations expirées sans tentative restante marquées en échec")
+        cur.execute(CLAIM_SQL, params)
+        rows = cur.fetchall()
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
 def download_and_upload_pictures():
     """
     Télécharge les images non uploadées depuis plants_data,
     les stocke dans S3, et met à jour la base avec l'URL.
+
+    Le travail est réservé par lots de `INGEST_CLAIM_SIZE` lignes
+    (FOR UPDATE SKIP LOCKED) : plusieurs workers peuvent vider la file en
+    parallèle, et après un crash les réservations expirées sont reprises.
+    Les transferts HTTP/S3 s'exécutent dans un pool de `INGEST_CONCURRENCY`
+    threads ; les url_s3 sont écrites en BDD par lots depuis le thread principal.
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
+    try:
+        with db_connection() as conn:
+            logger.info(f"Connecté à la base '{target_db}'")
+            ingest(conn)
+    except psycopg2.OperationalError as e:
+        logger.error(f"Connexion à la base '{target_db}' perdue ou impossible", exc_info=e)
+        sys.exit(1)
+    finally:
+        log_query_stats()
+
 
-    # Récupérer les enregistrements sans url_s3
+def ingest(conn):
+    """
+    Boucle de réservation / transfert / écriture, sur la connexion `conn`.
+    """
+    # Estimation du reste à faire (tous workers confondus)
     try:
-        cur.execute(
-            "SELECT id, url_source, label FROM plants_data WHERE url_s3 IS NULL"
-        )
-        rows = cur.fetchall()
-        logger.info(f"{len(rows)} images à traiter")
+        cur = conn.cursor()
+        cur.execute(REMAINING_SQL, (max_attempts,))
+        remaining = cur.fetchone()[0]
+        cur.close()
+        conn.commit()
+        logger.info(f"Worker '{worker_id}' : {remaining} images restant à traiter")
     except Exception as e:
         logger.error("Erreur récupération enregistrements", exc_info=e)
-        conn.close()
         sys.exit(1)
 
+    if s3_max_pool_connections < concurrency:
+        logger.warning(
+            f"S3_MAX_POOL_CONNECTIONS={s3_max_pool_connections} < INGEST_CONCURRENCY={concurrency} : "
+            "des threads attendront une connexion S3"
+        )
     s3 = get_s3_client()
     ensure_bucket_exists(s3)
+    existing_keys = list_existing_keys(s3)
 
-    for record_id, url_source, label in rows:
-        logger.info(f"Traitement id={record_id}, url={url_source}")
-        try:
-            resp = requests.get(url_source, timeout=10)
-            resp.raise_for_status()
-            data = resp.content
-            filename = os.path.basename(url_source)
-            key = f"{label}/{filename}"
+    progress = Progress(remaining)
+    writer = UrlS3Writer(conn)
+    pending = {}
+    claimed = deque()
+    exhausted = False
 
-            # Vérifier et uploader
-            try:
-                s3.head_object(Bucket=bucket_name, Key=key)
-                logger.info(f"Objet '{key}' existe déjà")
-            except ClientError as ce:
-                if ce.response['Error']['Code'] in ('404', 'NoSuchKey'):
-                    s3.put_object(Bucket=bucket_name, Key=key, Body=data)
-                    logger.info(f"Upload de '{key}' réussi")
-                else:
-                    logger.error(f"Erreur head_object pour '{key}'", exc_info=ce)
+    def submit_next(pool):
+        nonlocal exhausted
+        # Réservations locales expirées : un autre worker a pu les reprendre
+        expired = 0
+        while claimed and time.monotonic() - claimed[0][0] > claim_timeout_s:
+            claimed.popleft()
+            expired += 1
+        if expired:
+            logger.warning(f"{expired} réservations expirées avant traitement, abandonnées")
+        if not claimed and not exhausted:
+            claimed_at = time.monotonic()  # avant le claimed_at en BDD : jamais plus jeune
+            rows = claim_batch(conn, claim_size)
+            exhausted = not rows
+            claimed.extend((claimed_at, row) for row in rows)
+        if not claimed:
+            return False
+        _, (record_id, url_source) = claimed.popleft()
+        pending[pool.submit(transfer_picture, s3, existing_keys, url_source)] = (record_id, url_source)
+        return True
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest") as pool:
+        # Fenêtre bornée de transferts en vol (au plus 2 × INGEST_CONCURRENCY)
+        for _ in range(2 * concurrency):
+            if not submit_next(pool):
+                break
+
+        while pending:
+            finished, _ = wait(pending, timeout=writer.flush_every_s, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record_id, url_source = pending.pop(future)
+                submit_next(pool)
+                try:
+                    url_s3, content_hash, nbytes = future.result()
+                except Exception as e:
+                    logger.error(f"Erreur traitement id={record_id}, url={url_source}", exc_info=e)
+                    writer.fail(record_id, e)
+                    progress.done(ok=False)
                     continue
 
-            # Mettre à jour la BDD
-            url_s3 = f"{s3_endpoint}/{bucket_name}/{key}"
-            try:
-                cur.execute(
-                    "UPDATE plants_data SET url_s3 = %s WHERE id = %s",
-                    (url_s3, record_id)
-                )
-                conn.commit()
-                logger.info(f"Mise à jour BDD id={record_id} url_s3={url_s3}")
-            except Exception as e:
-                logger.error(f"Erreur update BDD id={record_id}", exc_info=e)
-                conn.rollback()
-        except Exception as e:
-            logger.error(f"Erreur traitement id={record_id}", exc_info=e)
-            continue
+                writer.add(record_id, url_s3, content_hash)
+                progress.done(nbytes)
+            writer.flush_if_due()
 
-    cur.close()
-    conn.close()
+    writer.flush()
+    progress.report(final=True)
+    logger.info(
+        f"BDD : {writer.written} url_s3 écrites, {writer.duplicated} doublons de contenu, "
+        f"{writer.failed} en erreur"
+    )
     logger.info("Traitement terminé")
 
 
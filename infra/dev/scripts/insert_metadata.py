@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 import sys
 import os
+import time
 import logging
+from itertools import islice
 from dotenv import load_dotenv
-import psycopg2
+from psycopg2.extras import execute_values
+
+from data_access import db_connection, log_query_stats
 
 # ─── CHARGEMENT DU .env ─────────────────────────────────────────
 load_dotenv()
@@ -17,66 +21,66 @@ logger = logging.getLogger(__name__)
 
 # ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
 target_db   = os.getenv("TARGET_DB_NAME")
-db_user     = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-db_host     = os.getenv("DB_HOST")
-db_port     = os.getenv("DB_PORT")
 
 # Base URL pour les images
 github_raw_base = os.getenv(
     "GITHUB_RAW_BASE")
 labels = os.getenv("PLANT_LABELS", "dandelion,grass").split(",")
 images_per_label = int(os.getenv("IMAGES_PER_LABEL", "200"))
+# Lignes envoyées par instruction INSERT multi-valeurs
+insert_page_size = int(os.getenv("INSERT_PAGE_SIZE", "5000"))
 
+INSERT_SQL = """
+INSERT INTO plants_data (url_source, url_s3, label) VALUES %s
+ON CONFLICT (url_source) DO NOTHING
+RETURNING 1
+"""
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            dbname=target_db,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        conn.autocommit = False
-        logger.info(f"Connecté à la base '{target_db}'")
-        return conn
-    except Exception as e:
-        logger.error(f"Échec de connexion à la base '{target_db}'", exc_info=e)
-        sys.exit(1)
+
+def iter_metadata():
+    """
+    Génère paresseusement les lignes (url_source, url_s3, label) attendues.
+    """
+    for label in labels:
+        for i in range(images_per_label):
+            yield f"{github_raw_base}/{label}/{i:08d}.jpg", None, label
 
 
 def insert_metadata():
     """
     Insère les URLs d'images dans la table plants_data si elles n'existent pas déjà.
-    """
-    conn = get_db_connection()
-    cur = conn.cursor()
 
+    Les lignes sont envoyées par pages de `INSERT_PAGE_SIZE` en une seule
+    instruction `INSERT ... ON CONFLICT (url_source) DO NOTHING` : les URLs
+    déjà présentes sont ignorées par Postgres, sans SELECT préalable.
+    """
+    total = inserted = 0
+    started = time.perf_counter()
     try:
-        for label in labels:
-            for i in range(images_per_label):
-                url = f"{github_raw_base}/{label}/{i:08d}.jpg"
-                cur.execute(
-                    "SELECT 1 FROM plants_data WHERE url_source = %s", (url,)
-                )
-                if cur.fetchone() is None:
-                    cur.execute(
-                        "INSERT INTO plants_data (url_source, url_s3, label) VALUES (%s, %s, %s)",
-                        (url, None, label)
-                    )
-                    logger.info(f"Inséré: {url}")
-                else:
-                    logger.debug(f"Exist: {url}")
-        conn.commit()
-        logger.info("Insertion des métadonnées terminée avec succès.")
+        with db_connection() as conn:
+            logger.info(f"Connecté à la base '{target_db}'")
+            with conn.cursor() as cur:
+                rows = iter_metadata()
+                while True:
+                    page = list(islice(rows, insert_page_size))
+                    if not page:
+                        break
+                    # RETURNING ne renvoie que les lignes réellement insérées
+                    returned = execute_values(cur, INSERT_SQL, page, page_size=len(page), fetch=True)
+                    total += len(page)
+                    inserted += len(returned)
+                    logger.debug(f"{total} URLs traitées ({inserted} insérées)")
+            conn.commit()
+        logger.info(
+            f"Insertion des métadonnées terminée avec succès : {inserted} insérées, "
+            f"{total - inserted} déjà présentes, en {time.perf_counter() - started:.1f}s."
+        )
     except Exception as e:
+        # La transaction non commitée est annulée au retour de la connexion dans le pool
         logger.error("Erreur lors de l'insertion des métadonnées", exc_info=e)
-        conn.rollback()
         sys.exit(1)
     finally:
-        cur.close()
-        conn.close()
+        log_query_stats()
         logger.info("Connexion fermée.")
 
 if __name__ == "__main__":
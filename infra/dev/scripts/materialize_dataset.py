@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import sys
+import os
+import time
+import logging
+from dotenv import load_dotenv
+
+from data_access import db_connection, get_s3_client, log_query_stats
+from ml.dataset_cache import ShardDataset, load_index, records_fingerprint, split_s3_url, write_shards
+from ml.tensor_store import build_tensor_store, load_meta
+
+# ─── CHARGEMENT DU .env ─────────────────────────────────────────
+load_dotenv()
+
+# ─── CONFIGURATION DU LOGGING ─────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
+# Base de données
+target_db   = os.getenv("TARGET_DB_NAME")
+
+# Dataset local
+dataset_dir = os.getenv("DATASET_DIR", "/opt/airflow/data/plants")
+shard_size  = int(os.getenv("DATASET_SHARD_SIZE", "1000"))
+# Nombre de lancements où une image en échec est retentée avant d'être abandonnée
+fetch_max_attempts = int(os.getenv("DATASET_FETCH_MAX_ATTEMPTS", "3"))
+tensor_store_dir = os.getenv("TENSOR_STORE_DIR", "/opt/airflow/data/plants-tensors")
+
+
+def materialize_dataset():
+    """
+    Copie une seule fois les images déjà présentes dans Minio (url_s3) vers
+    des shards tar locaux indexés, puis les prétraite en un tensor store mappé
+    en mémoire, lu ensuite par l'entraînement sans accès réseau ni décodage.
+    Ne refait que les étapes dont le résultat n'est plus à jour.
+    """
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            logger.info(f"Connecté à la base '{target_db}'")
+            cur.execute(
+                "SELECT id, url_s3, label FROM plants_data WHERE url_s3 IS NOT NULL ORDER BY id"
+            )
+            records = cur.fetchall()
+        logger.info(f"{len(records)} images référencées dans Minio")
+    except Exception as e:
+        logger.error("Erreur récupération enregistrements", exc_info=e)
+        sys.exit(1)
+    finally:
+        log_query_stats()
+
+    index = load_index(dataset_dir)
+    if index is not None and index["fingerprint"] == records_fingerprint(records):
+        logger.info(f"Dataset local '{dataset_dir}' déjà à jour ({len(index['samples'])} images)")
+    else:
+        index = write_dataset_shards(records, index)
+    if tensor_store_dir:
+        materialize_tensor_store(index)
+
+
+def write_dataset_shards(records, previous=None):
+    """
+    Complète les shards locaux : seules les images absentes du dataset
+    `previous` (nouvelles, modifiées ou en échec) sont téléchargées depuis Minio.
+    """
+    s3 = get_s3_client()
+
+    def fetch(url_s3):
+        bucket, key = split_s3_url(url_s3)
+        return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+    def on_error(record_id, url_s3, e):
+        logger.error(f"Téléchargement impossible id={record_id}, url={url_s3}", exc_info=e)
+
+    started = time.perf_counter()
+    index = write_shards(
+        records, fetch, dataset_dir, shard_size=shard_size, on_error=on_error, max_attempts=fetch_max_attempts
+    )
+    elapsed = time.perf_counter() - started
+    known = {(sample["shard"], sample["offset"]) for sample in (previous or {}).get("samples", [])}
+    added = [sample for sample in index["samples"] if (sample["shard"], sample["offset"]) not in known]
+    logger.info(
+        f"Dataset matérialisé dans '{dataset_dir}' : {len(index['samples'])} images dont {len(added)} "
+        f"téléchargées ({sum(s['size'] for s in added) / 1e6:.1f} Mo), {index['num_shards']} shards, "
+        f"en {elapsed:.1f}s"
+    )
+    abandoned = sum(1 for entry in index["failed"].values() if entry["attempts"] >= fetch_max_attempts)
+    if len(index["failed"]) > abandoned:
+        logger.warning(
+            f"{len(index['failed']) - abandoned} images non téléchargées : elles seront retentées au prochain lancement"
+        )
+    if abandoned:
+        logger.warning(
+            f"{abandoned} images abandonnées après {fetch_max_attempts} tentatives (absentes du dataset)"
+        )
+    return index
+
+
+def materialize_tensor_store(index):
+    """
+    Décode et redimensionne une seule fois toutes les images des shards vers un
+    tableau uint8 mappé en mémoire : l'entraînement ne décode plus de JPEG.
+    """
+    meta = load_meta(tensor_store_dir)
+    if meta is not None and meta["fingerprint"] == index["fingerprint"]:
+        logger.info(f"Tensor store '{tensor_store_dir}' déjà à jour ({meta['n']} images)")
+        return
+
+    def on_error(record_id, e):
+        logger.error(f"Image illisible id={record_id}, remplacée par une image noire", exc_info=e)
+
+    started = time.perf_counter()
+    build_tensor_store(
+        ShardDataset(index["samples"], dataset_dir),
+        tensor_store_dir,
+        index["fingerprint"],
+        on_error=on_error,
+    )
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Tensor store écrit dans '{tensor_store_dir}' : {len(index['samples'])} images "
+        f"prétraitées en {elapsed:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    materialize_dataset()
@@ -0,0 +1,70 @@
+import io
+import logging
+
+import torch
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------
+# Training checkpoints stored as a single S3/MinIO object
+class CheckpointStore:
+    """
+    Latest training checkpoint of one logical run (e.g. one DAG run) at
+    s3://{bucket}/{prefix}/latest.pt. Each save overwrites the previous one.
+    """
+
+    def __init__(self, s3, bucket, prefix):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = f"{prefix.rstrip('/')}/latest.pt"
+
+    def save(self, state):
+        buffer = io.BytesIO()
+        torch.save(state, buffer)
+        buffer.seek(0)
+        self.s3.upload_fileobj(buffer, self.bucket, self.key)
+        logger.info(f"Checkpoint epoch {state.get('epoch')} saved to s3://{self.bucket}/{self.key}")
+
+    def load(self, map_location=None):
+        """Latest checkpoint, or None if there is none."""
+        buffer = io.BytesIO()
+        try:
+            self.s3.download_fileobj(self.bucket, self.key, buffer)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        buffer.seek(0)
+        return torch.load(buffer, map_location=map_location)
+
+    def delete(self):
+        self.s3.delete_object(Bucket=self.bucket, Key=self.key)
+
+
+def snapshot(state_dict):
+    """Detached copy of a state_dict (a plain state_dict() keeps referencing the live tensors)."""
+    return {k: v.detach().clone() for k, v in state_dict.items()}
+
+
+class EarlyStopping:
+    """Stops after `patience` epochs without a `min_delta` improvement of the monitored score."""
+
+    def __init__(self, patience=0, min_delta=0.0, best=None, bad_epochs=0):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best = best
+        self.bad_epochs = bad_epochs
+
+    def step(self, score):
+        """Records `score`; returns True if it is a new best."""
+        if self.best is None or score > self.best + self.min_delta:
+            self.best = score
+            self.bad_epochs = 0
+            return True
+        self.bad_epochs += 1
+        return False
+
+    @property
+    def should_stop(self):
+        return self.patience > 0 and self.bad_epochs >= self.patience
@@ -1,29 +1,49 @@
-import psycopg2
+import os
+import torch
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image
 from io import BytesIO
 from torchvision import transforms
 from torch.utils.data import Dataset, DataLoader
+from torch.utils.data.distributed import DistributedSampler
 from sklearn.model_selection import train_test_split
 
-# ------------------------------------------
-# Configs
-DB_CONFIG = {
-    "dbname": "mlops_data",
-    "user": "airflow",
-    "password": "airflow",
-    "host": "postgres",
-    "port": "5432"
-}
+from data_access import db_connection
+from ml.dataset_cache import ShardDataset, load_index
+from ml.tensor_store import TensorStoreDataset, BatchTransform, ShardSampler, load_meta, make_store_loader
 
+# ------------------------------------------
+# Configs (database access comes from data_access: TARGET_DB_NAME, DB_*)
 IMG_SIZE = (224, 224)
 BATCH_SIZE = 32
 
+# Local shards written by materialize_dataset.py (used when present)
+DATASET_DIR = os.getenv("DATASET_DIR", "/opt/airflow/data/plants")
+# Pre-decoded uint8 tensors written by materialize_dataset.py (preferred when present)
+TENSOR_STORE_DIR = os.getenv("TENSOR_STORE_DIR", "/opt/airflow/data/plants-tensors")
+# Batch-level augmentation on the tensor store path (0 keeps the historical no-augmentation training)
+TRAIN_HFLIP_P = float(os.getenv("TRAIN_HFLIP_P", "0"))
+
+# DataLoader settings ("auto" / empty = sized from the machine)
+LOADER_NUM_WORKERS = os.getenv("LOADER_NUM_WORKERS", "auto")
+LOADER_PREFETCH_FACTOR = int(os.getenv("LOADER_PREFETCH_FACTOR", "4"))
+LOADER_PIN_MEMORY = os.getenv("LOADER_PIN_MEMORY", "auto")
+
+# Same train/val split on every rank in distributed training
+DATA_SPLIT_SEED = int(os.getenv("DATA_SPLIT_SEED", "42"))
+
 # ------------------------------------------
 # Transform for preprocessing
+# Same normalization as the API preprocessing (src/api/preprocessing.py): train and serve inputs match
+MEAN = (.485, .456, .406)
+STD = (.229, .224, .225)
+
 transform = transforms.Compose([
     transforms.Resize(IMG_SIZE),
     transforms.ToTensor(),
+    transforms.Normalize(mean=list(MEAN), std=list(STD)),
 ])
 
 # ------------------------------------------
@@ -33,14 +53,28 @@ class PlantDataset(Dataset):
         self.data = data  # list of (url, label)
         self.transform = transform
         self.label_map = {"dandelion": 0, "grass": 1}
+        self._session = None
+        self._pid = None
 
     def __len__(self):
         return len(self.data)
 
+    def _http(self):
+        # One pooled session per process: DataLoader workers must not share sockets
+        if self._pid != os.getpid():
+            session = requests.Session()
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            session.mount("http://", HTTPAdapter(max_retries=retry))
+            session.mount("https://", HTTPAdapter(max_retries=retry))
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
+
     def __getitem__(self, idx):
         url, label = self.data[idx]
         try:
-            response = requests.get(url, timeout=10)
+            response = self._http().get(url, timeout=10)
+            response.raise_for_status()
             image = Image.open(BytesIO(response.content)).convert("RGB")
         except Exception as e:
             print(f"Failed to load image from {url}: {e}")
@@ -51,29 +85,126 @@ class PlantDataset(Dataset):
 
         return image, self.label_map[label]
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_session"] = None
+        state["_pid"] = None
+        return state
+
 # ------------------------------------------
 # Fetch Data from PostgreSQL
 def fetch_image_data():
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute("SELECT url_source, label FROM plants_data WHERE url_source IS NOT NULL;")
-    data = cur.fetchall()
-    cur.close()
-    conn.close()
-    return data  # list of (url, label)
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT url_source, label FROM plants_data WHERE url_source IS NOT NULL ORDER BY id;")
+        return cur.fetchall()  # list of (url, label)
 
 # ------------------------------------------
-# Create DataLoaders
-def get_dataloaders(test_size=0.2, batch_size=BATCH_SIZE):
+# Build train/val datasets: tensor store, then local shards, network otherwise
+def get_datasets(test_size=0.2, dataset_dir=DATASET_DIR, store_dir=TENSOR_STORE_DIR, random_state=None):
+    index = load_index(dataset_dir) if dataset_dir else None
+    meta = load_meta(store_dir) if store_dir else None
+    if meta is not None and index is not None and meta["fingerprint"] == index["fingerprint"]:
+        # Labels follow the materialized index order, like the store
+        labels = [s["label"] for s in index["samples"]]
+        train_idx, val_idx = train_test_split(
+            list(range(meta["n"])), test_size=test_size, stratify=labels, random_state=random_state
+        )
+        return (TensorStoreDataset(store_dir, train_idx, BatchTransform(hflip_p=TRAIN_HFLIP_P, mean=MEAN, std=STD)),
+                TensorStoreDataset(store_dir, val_idx, BatchTransform(mean=MEAN, std=STD)))
+
+    if index is not None:
+        samples = index["samples"]
+        train_samples, val_samples = train_test_split(
+            samples, test_size=test_size, stratify=[s["label"] for s in samples], random_state=random_state
+        )
+        return (ShardDataset(train_samples, dataset_dir, transform=transform),
+                ShardDataset(val_samples, dataset_dir, transform=transform))
+
+    print(f"No materialized dataset in {dataset_dir}, images will be fetched over the network")
     all_data = fetch_image_data()
     train_data, val_data = train_test_split(
-        all_data, test_size=test_size, stratify=[label for _, label in all_data]
+        all_data, test_size=test_size, stratify=[label for _, label in all_data], random_state=random_state
     )
+    return (PlantDataset(train_data, transform=transform),
+            PlantDataset(val_data, transform=transform))
+
+# ------------------------------------------
+# DataLoader configuration
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
-    train_dataset = PlantDataset(train_data, transform=transform)
-    val_dataset = PlantDataset(val_data, transform=transform)
 
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False)
+def loader_options(num_workers=LOADER_NUM_WORKERS, prefetch_factor=LOADER_PREFETCH_FACTOR,
+                   pin_memory=LOADER_PIN_MEMORY, persistent_workers=True):
+    """
+    DataLoader keyword arguments. "auto" workers leaves one core to the
+    training loop; "auto" pin_memory is enabled only when CUDA is available.
+    Worker-only options are dropped when loading in the main process.
+    """
+    if num_workers in (None, "", "auto"):
+        # Cores are shared between the local ranks under torchrun
+        local_ranks = int(os.getenv("LOCAL_WORLD_SIZE", "1"))
+        num_workers = max(0, available_cpus() // local_ranks - 1)
+    num_workers = int(num_workers)
+    if pin_memory in (None, "", "auto"):
+        pin_memory = torch.cuda.is_available()
+    elif isinstance(pin_memory, str):
+        pin_memory = pin_memory.lower() in ("1", "true", "yes")
+
+    options = {"num_workers": num_workers, "pin_memory": pin_memory}
+    if num_workers > 0:
+        options["persistent_workers"] = persistent_workers
+        options["prefetch_factor"] = prefetch_factor
+    return options
+
+# ------------------------------------------
+# Create DataLoaders
+def get_dataloaders(test_size=0.2, batch_size=BATCH_SIZE, dataset_dir=DATASET_DIR, store_dir=TENSOR_STORE_DIR,
+                    loader_config=None, distributed=False):
+    """
+    `loader_config` overrides loader_options() (num_workers, prefetch_factor,
+    pin_memory, persistent_workers). With `distributed`, the split is seeded
+    (DATA_SPLIT_SEED) so every rank agrees on it, and each rank only iterates
+    its own shard of both splits: DistributedSampler for training (call
+    set_epoch each epoch), unpadded ShardSampler for validation so no sample
+    is counted twice in the all-reduced metrics.
+    """
+    train_dataset, val_dataset = get_datasets(
+        test_size=test_size, dataset_dir=dataset_dir, store_dir=store_dir,
+        random_state=DATA_SPLIT_SEED if distributed else None,
+    )
+    return make_dataloaders(train_dataset, val_dataset, batch_size=batch_size, loader_config=loader_config,
+                            distributed=distributed)
+
+
+def make_dataloaders(train_dataset, val_dataset, batch_size=BATCH_SIZE, loader_config=None, distributed=False):
+    """Train/val DataLoaders over datasets returned by get_datasets."""
+    options = loader_options(**(loader_config or {}))
+
+    if isinstance(train_dataset, TensorStoreDataset):
+        # Whole batches are gathered from the memory map: no per-sample collation
+        return (make_store_loader(train_dataset, batch_size, shuffle=True, distributed=distributed, **options),
+                make_store_loader(val_dataset, batch_size, shuffle=False, distributed=distributed, **options))
+
+    if distributed:
+        train_loader = DataLoader(train_dataset, batch_size=batch_size,
+                                  sampler=DistributedSampler(train_dataset, shuffle=True), **options)
+        val_loader = DataLoader(val_dataset, batch_size=batch_size,
+                                sampler=ShardSampler(val_dataset), **options)
+        return train_loader, val_loader
+
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, **options)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, **options)
 
     return train_loader, val_loader
+
+
+def set_epoch(loader, epoch):
+    """Reshuffle a distributed loader's shard for `epoch` (no-op otherwise)."""
+    sampler = loader.sampler
+    sampler = getattr(sampler, "sampler", sampler)  # BatchSampler of the tensor store
+    if isinstance(sampler, DistributedSampler):
+        sampler.set_epoch(epoch)
@@ -0,0 +1,203 @@
+import os
+import io
+import json
+import hashlib
+import tarfile
+import tempfile
+from urllib.parse import urlparse
+
+from PIL import Image
+from torch.utils.data import Dataset
+
+INDEX_FILE = "index.json"
+SHARD_PATTERN = "shard-{:05d}.tar"
+LABEL_MAP = {"dandelion": 0, "grass": 1}
+IMG_SIZE = (224, 224)
+
+# ------------------------------------------
+# Helpers
+def split_s3_url(url_s3):
+    """`{endpoint}/{bucket}/{key}` (as written by download_and_upload_pictures) -> (bucket, key)."""
+    path = urlparse(url_s3).path.lstrip("/")
+    bucket, key = path.split("/", 1)
+    return bucket, key
+
+
+def records_fingerprint(records):
+    """Stable hash of the (id, url_s3, label) set, used to detect a stale cache."""
+    digest = hashlib.sha256()
+    for record_id, url_s3, label in sorted(records):
+        digest.update(f"{record_id}\t{url_s3}\t{label}\n".encode())
+    return digest.hexdigest()
+
+
+def load_index(dataset_dir):
+    """Return the materialized index, or None if the dataset is not materialized."""
+    try:
+        with open(os.path.join(dataset_dir, INDEX_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+# ------------------------------------------
+# Materialization: images -> packed tar shards + index
+def write_shards(records, fetch, dataset_dir, shard_size=1000, on_error=None, max_attempts=3):
+    """
+    Bring the dataset under `dataset_dir` up to date with the (id, url_s3,
+    label) records. Images already packed for the same url_s3 and label are
+    kept where they are. Only the other records are fetched, with
+    `fetch(url_s3)` returning the image bytes, and packed into new tar shards
+    of `shard_size` images. The index gives each sample's shard, byte offset,
+    size and content hash.
+
+    Records that fail to fetch are listed under "failed" with their attempt
+    count and retried on later runs. After `max_attempts` they are given up:
+    they count towards the fingerprint, so a dataset with only given-up
+    records missing is up to date and is not touched again.
+
+    New shards are written first and the index is replaced atomically last.
+    Samples of removed records stay in their shard, unreferenced (delete
+    `dataset_dir` to repack). Returns the index.
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    previous = load_index(dataset_dir) or {}
+    current = {record[0]: record for record in records}
+
+    def unchanged(sample):
+        record = current.get(sample["id"])
+        return (record is not None and record[2] == sample["label"]
+                and sample.get("url_s3", record[1]) == record[1])
+
+    samples = [sample for sample in previous.get("samples", []) if unchanged(sample)]
+    packed = {sample["id"] for sample in samples}
+    failed = {}
+    for record_id, entry in previous.get("failed", {}).items():
+        record = current.get(int(record_id))
+        if record is not None and record[1] == entry["url_s3"] and int(record_id) not in packed:
+            failed[record_id] = entry
+
+    def gave_up(record_id):
+        entry = failed.get(str(record_id))
+        return entry is not None and entry["attempts"] >= max_attempts
+
+    shard = None
+    shard_path = None
+    shard_id = previous.get("num_shards", 0) - 1
+    shard_count = 0
+
+    def close_shard():
+        shard.close()
+        os.replace(shard_path + ".tmp", shard_path)
+
+    try:
+        for record_id, url_s3, label in records:
+            if record_id in packed or gave_up(record_id):
+                continue
+            try:
+                data = fetch(url_s3)
+            except Exception as e:
+                if on_error:
+                    on_error(record_id, url_s3, e)
+                entry = failed.setdefault(str(record_id), {"url_s3": url_s3, "attempts": 0})
+                entry["attempts"] += 1
+                entry["last_error"] = str(e)[:500]
+                continue
+            failed.pop(str(record_id), None)
+
+            if shard is None or shard_count >= shard_size:
+                if shard is not None:
+                    close_shard()
+                shard_id += 1
+                shard_count = 0
+                shard_path = os.path.join(dataset_dir, SHARD_PATTERN.format(shard_id))
+                shard = tarfile.open(shard_path + ".tmp", "w")
+
+            info = tarfile.TarInfo(name=f"{record_id}.jpg")
+            info.size = len(data)
+            shard.addfile(info, io.BytesIO(data))
+            # The shard now ends after the block-padded payload: step back over it
+            padded = tarfile.BLOCKSIZE * ((len(data) + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE)
+            offset = shard.offset - padded
+            samples.append({
+                "id": record_id,
+                "label": label,
+                "url_s3": url_s3,
+                "shard": SHARD_PATTERN.format(shard_id),
+                "offset": offset,
+                "size": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+            })
+            shard_count += 1
+        if shard is not None:
+            close_shard()
+    except Exception:
+        if shard is not None:
+            shard.close()
+            os.remove(shard_path + ".tmp")
+        raise
+
+    accounted = [current[sample["id"]] for sample in samples]
+    accounted += [current[int(record_id)] for record_id in failed if gave_up(record_id)]
+    index = {
+        "fingerprint": records_fingerprint(accounted),
+        "num_shards": shard_id + 1,
+        "samples": samples,
+        "failed": failed,
+    }
+    fd, tmp = tempfile.mkstemp(dir=dataset_dir, prefix=f".{INDEX_FILE}-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, os.path.join(dataset_dir, INDEX_FILE))
+    return index
+
+# ------------------------------------------
+# Dataset reading samples from local shards (no network)
+class ShardDataset(Dataset):
+    def __init__(self, samples, dataset_dir, transform=None):
+        self.samples = samples  # list of index entries
+        self.dataset_dir = dataset_dir
+        self.transform = transform
+        self.label_map = LABEL_MAP
+        self._files = {}
+        self._pid = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def _shard_file(self, name):
+        # File handles are per process: DataLoader workers must not share offsets
+        if self._pid != os.getpid():
+            self._files = {}
+            self._pid = os.getpid()
+        f = self._files.get(name)
+        if f is None:
+            f = open(os.path.join(self.dataset_dir, name), "rb")
+            self._files[name] = f
+        return f
+
+    def read_bytes(self, idx):
+        sample = self.samples[idx]
+        f = self._shard_file(sample["shard"])
+        f.seek(sample["offset"])
+        return f.read(sample["size"])
+
+    def content_hash(self, idx):
+        """sha256 of the image bytes (recorded in the index, recomputed for older indexes)."""
+        return self.samples[idx].get("sha256") or hashlib.sha256(self.read_bytes(idx)).hexdigest()
+
+    def __getitem__(self, idx):
+        try:
+            image = Image.open(io.BytesIO(self.read_bytes(idx))).convert("RGB")
+        except Exception as e:
+            # Same fallback as PlantDataset and build_tensor_store: one bad image must not stop training
+            print(f"Failed to decode sample {self.samples[idx]['id']} from {self.samples[idx]['shard']}: {e}")
+            image = Image.new("RGB", IMG_SIZE)  # dummy black image
+        if self.transform:
+            image = self.transform(image)
+        return image, self.label_map[self.samples[idx]["label"]]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_files"] = {}
+        state["_pid"] = None
+        return state
@@ -0,0 +1,149 @@
+import time
+from contextlib import nullcontext
+
+import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+
+from ml.profiling import PhaseTimer
+
+# ------------------------------------------
+# Runtime configuration
+def set_threads(intra_op=0, inter_op=0):
+    """0 keeps torch's default. inter-op threads can only be set before any parallel work."""
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            pass
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def bf16_supported(device):
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        # oneDNN bf16 kernels need AVX512-BF16 / AMX (or at least AVX512 emulation)
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+class Engine:
+    """
+    Optional fast paths for the training loop, each behind its own flag:
+    channels_last memory format, bfloat16 autocast and torch.compile.
+    Loss and accuracy are accumulated on-device and read once per epoch.
+
+    With `distributed`, the model is wrapped in DistributedDataParallel
+    (process group already initialized) and the epoch metrics are summed
+    over all ranks, so every rank sees the same global loss and accuracy.
+    """
+
+    def __init__(self, model, device, channels_last=False, bf16=False, compile=False, distributed=False):
+        self.model = model
+        self.device = device
+        self.channels_last = channels_last
+        self.bf16 = bf16 and bf16_supported(device)
+        self.compiled = compile and hasattr(torch, "compile")
+        self.distributed = distributed
+        if channels_last:
+            model.to(memory_format=torch.channels_last)
+        # DDP and the compiled module share their parameters with `model`
+        step_model = DistributedDataParallel(model) if distributed else model
+        self.step_model = torch.compile(step_model) if self.compiled else step_model
+        # Ranks may see different numbers of validation batches: evaluate outside
+        # DDP so no collective (buffer broadcast) runs per forward
+        self.eval_model = model if distributed else self.step_model
+
+    def flags(self):
+        return {"channels_last": self.channels_last, "bf16": self.bf16, "compile": self.compiled,
+                "world_size": dist.get_world_size() if self.distributed else 1}
+
+    def _totals(self, loss_sum, correct, images):
+        """(mean loss, accuracy, images) over all ranks, with a single host sync."""
+        totals = torch.stack([loss_sum.float(), correct.float(),
+                              torch.tensor(float(images), device=loss_sum.device)])
+        if self.distributed:
+            dist.all_reduce(totals)
+        loss_sum, correct, images = totals.tolist()
+        images = max(int(images), 1)
+        return loss_sum / images, correct / images, images
+
+    def _autocast(self):
+        if self.bf16:
+            return torch.autocast(device_type=self.device.type, dtype=torch.bfloat16)
+        return nullcontext()
+
+    def _inputs(self, imgs, labels):
+        if self.channels_last:
+            imgs = imgs.to(self.device, memory_format=torch.channels_last, non_blocking=True)
+        else:
+            imgs = imgs.to(self.device, non_blocking=True)
+        return imgs, labels.to(self.device, non_blocking=True)
+
+    def train_epoch(self, batches, criterion, optimizer, max_steps=0, timer=None, profiler=None):
+        """
+        One pass over `batches` (any iterable of (imgs, labels)).
+        Returns (mean loss, accuracy, images, seconds); images counts all ranks.
+        Phase times (loader wait, host-to-device, forward, backward, optimizer)
+        are added to `timer` (a PhaseTimer); `profiler` is stepped after each step.
+        """
+        timer = timer if timer is not None else PhaseTimer(self.device)
+        self.step_model.train()
+        loss_sum = torch.zeros((), device=self.device)
+        correct = torch.zeros((), dtype=torch.long, device=self.device)
+        images = steps = 0
+        started = time.perf_counter()
+        batches = iter(batches)
+        while True:
+            with timer.phase("data_wait"):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            with timer.phase("h2d"):
+                imgs, labels = self._inputs(*batch)
+            optimizer.zero_grad(set_to_none=True)
+            with timer.phase("forward"), self._autocast():
+                outputs = self.step_model(imgs)
+                loss = criterion(outputs, labels)
+            with timer.phase("backward"):
+                loss.backward()
+            with timer.phase("optimizer"):
+                optimizer.step()
+
+            loss_sum += loss.detach().float() * imgs.size(0)
+            correct += (outputs.detach().argmax(1) == labels).sum()
+            images += imgs.size(0)
+            steps += 1
+            timer.steps += 1
+            if profiler is not None:
+                profiler.step()
+            if max_steps and steps >= max_steps:
+                break
+        # Single host sync for the whole epoch
+        loss, acc, images = self._totals(loss_sum, correct, images)
+        return loss, acc, images, time.perf_counter() - started
+
+    def evaluate(self, batches, criterion):
+        """Returns (mean loss, accuracy, images)."""
+        self.eval_model.eval()
+        loss_sum = torch.zeros((), device=self.device)
+        correct = torch.zeros((), dtype=torch.long, device=self.device)
+        images = 0
+        with torch.no_grad(), self._autocast():
+            for imgs, labels in batches:
+                imgs, labels = self._inputs(imgs, labels)
+                outputs = self.eval_model(imgs)
+                loss_sum += criterion(outputs, labels).float() * imgs.size(0)
+                correct += (outputs.argmax(1) == labels).sum()
+                images += imgs.size(0)
+        return self._totals(loss_sum, correct, images)
+
+    def finalize(self):
+        """Back to the default layout before scripting / exporting the model."""
+        if self.channels_last:
+            self.model.to(memory_format=torch.contiguous_format)
+        return self.model
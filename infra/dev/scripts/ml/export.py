@@ -0,0 +1,81 @@
+import torch
+import torch.nn as nn
+
+IMG_SHAPE = (3, 224, 224)
+
+# ------------------------------------------
+# ONNX export (dynamic batch dimension)
+def export_onnx(model, path, opset=17):
+    model.eval()
+    dummy = torch.randn(1, *IMG_SHAPE)
+    torch.onnx.export(
+        model, dummy, path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+    )
+    return path
+
+
+class OnnxRuntimeModel:
+    """ONNX Runtime session wrapped as a callable: (N, C, H, W) tensor -> logits."""
+
+    def __init__(self, path):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        out = self.session.run(None, {self.input_name: batch.contiguous().numpy()})[0]
+        return torch.from_numpy(out)
+
+# ------------------------------------------
+# Static int8 post-training quantization of the ResNet18 backbone
+def quantize_static(model, calib_batches):
+    from torchvision.models.quantization import resnet18 as quantizable_resnet18
+
+    engines = torch.backends.quantized.supported_engines
+    engine = "x86" if "x86" in engines else "fbgemm"
+    torch.backends.quantized.engine = engine
+
+    qmodel = quantizable_resnet18(weights=None, quantize=False)
+    qmodel.fc = nn.Linear(qmodel.fc.in_features, model.model.fc.out_features)
+    qmodel.load_state_dict({k: v.cpu() for k, v in model.model.state_dict().items()})
+    qmodel.eval()
+    qmodel.fuse_model()
+    qmodel.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(qmodel, inplace=True)
+
+    # Calibration of activation ranges
+    with torch.no_grad():
+        for imgs in calib_batches:
+            qmodel(imgs)
+
+    torch.ao.quantization.convert(qmodel, inplace=True)
+    return torch.jit.script(qmodel)
+
+# ------------------------------------------
+# Accuracy parity against the fp32 reference on the validation split
+def parity_report(reference, candidate, batches):
+    n = ref_correct = cand_correct = agree = 0
+    max_abs_diff = 0.0
+    with torch.no_grad():
+        for imgs, labels in batches:
+            ref_out = reference(imgs)
+            cand_out = candidate(imgs).float()
+            ref_pred = ref_out.argmax(1)
+            cand_pred = cand_out.argmax(1)
+            n += labels.size(0)
+            ref_correct += (ref_pred == labels).sum().item()
+            cand_correct += (cand_pred == labels).sum().item()
+            agree += (ref_pred == cand_pred).sum().item()
+            max_abs_diff = max(max_abs_diff, (ref_out - cand_out).abs().max().item())
+
+    return {
+        "ref_acc": ref_correct / n if n else 0.0,
+        "acc": cand_correct / n if n else 0.0,
+        "agreement": agree / n if n else 0.0,
+        "max_abs_logit_diff": max_abs_diff,
+    }
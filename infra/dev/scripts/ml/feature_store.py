@@ -0,0 +1,122 @@
+import os
+import copy
+import json
+import hashlib
+import tempfile
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+
+FEATURES_FILE = "features.npy"
+KEYS_FILE = "keys.json"
+
+# Bump when the input pipeline feeding the backbone changes (resize, scaling...)
+PIPELINE_VERSION = "resize224-totensor-normalize-v2"
+
+# ------------------------------------------
+# Backbone helpers
+def frozen_backbone(model):
+    """Copy of the classifier's ResNet with fc removed: (N, 3, H, W) -> (N, 512)."""
+    backbone = copy.deepcopy(model.model)
+    backbone.fc = nn.Identity()
+    for param in backbone.parameters():
+        param.requires_grad_(False)
+    return backbone.eval()
+
+
+def backbone_version(model):
+    """Hash of the backbone weights (everything but fc) and of the input pipeline."""
+    digest = hashlib.sha256(PIPELINE_VERSION.encode())
+    for name, tensor in model.state_dict().items():
+        if name.startswith("model.fc."):
+            continue
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+# ------------------------------------------
+# On-disk store: one directory per backbone version, features keyed by image hash
+class FeatureStore:
+    def __init__(self, root, version):
+        self.dir = os.path.join(root, version)
+        self.version = version
+        self.keys = []
+        self.features = np.empty((0, 0), dtype=np.float32)
+        self._positions = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.dir, KEYS_FILE)) as f:
+                keys = json.load(f)
+            features = np.load(os.path.join(self.dir, FEATURES_FILE))
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            return
+        if len(keys) == len(features):
+            self.keys = keys
+            self.features = features
+            self._positions = {key: i for i, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def missing(self, hashes):
+        return sorted({h for h in hashes if h not in self._positions})
+
+    def get(self, hashes):
+        return torch.from_numpy(self.features[[self._positions[h] for h in hashes]])
+
+    def add(self, hashes, features):
+        features = np.asarray(features, dtype=np.float32)
+        base = len(self.keys)
+        self.features = features if base == 0 else np.concatenate([self.features, features])
+        self.keys.extend(hashes)
+        self._positions.update({h: base + i for i, h in enumerate(hashes)})
+        self._save()
+
+    def _save(self):
+        # Features first, then keys: a crash in between leaves a detectable mismatch
+        os.makedirs(self.dir, exist_ok=True)
+        for name, write in (
+            (FEATURES_FILE, lambda f: np.save(f, self.features)),
+            (KEYS_FILE, lambda f: f.write(json.dumps(self.keys).encode())),
+        ):
+            fd, tmp = tempfile.mkstemp(dir=self.dir, prefix=f".{name}-")
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, os.path.join(self.dir, name))
+
+# ------------------------------------------
+# Feature extraction
+def dataset_features(model, dataset, store, batch_size=64, device=None, **loader_kwargs):
+    """
+    Penultimate features and labels for every sample of a ShardDataset,
+    computing (and storing) only the images the store has not seen yet.
+    Returns (features (N, 512), labels (N,), number of images computed).
+    """
+    device = device or torch.device("cpu")
+    hashes = [dataset.content_hash(i) for i in range(len(dataset))]
+    missing = set(store.missing(hashes))
+
+    if missing:
+        positions, new_hashes = [], []
+        for i, h in enumerate(hashes):
+            if h in missing:
+                positions.append(i)
+                new_hashes.append(h)
+                missing.discard(h)  # duplicates inside the dataset are computed once
+        backbone = frozen_backbone(model).to(device)
+        loader = DataLoader(Subset(dataset, positions), batch_size=batch_size, shuffle=False, **loader_kwargs)
+        chunks = []
+        with torch.no_grad():
+            for imgs, _ in loader:
+                chunks.append(backbone(imgs.to(device)).cpu())
+        store.add(new_hashes, torch.cat(chunks).numpy())
+        computed = len(new_hashes)
+    else:
+        computed = 0
+
+    labels = torch.tensor([dataset.label_map[s["label"]] for s in dataset.samples])
+    return store.get(hashes), labels, computed
@@ -0,0 +1,86 @@
+import os
+import resource
+import time
+from contextlib import nullcontext
+
+import torch
+
+PHASES = ("data_wait", "h2d", "forward", "backward", "optimizer")
+
+# ------------------------------------------
+# Per-step phase timing
+class PhaseTimer:
+    """
+    Wall-clock seconds spent in each phase of the training step, summed over
+    the steps of an epoch. On CUDA each phase ends with a synchronize so the
+    kernels are charged to the phase that launched them; on CPU the ops are
+    synchronous and timing is a perf_counter pair per phase.
+    `record` also labels the phases in a running torch.profiler trace.
+    """
+
+    def __init__(self, device=None, record=False):
+        self.sync = device is not None and device.type == "cuda"
+        self.record = record
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.steps = 0
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def summary(self):
+        """{phase}_ms per step and {phase}_fraction of the timed total."""
+        steps = max(self.steps, 1)
+        total = sum(self.seconds.values()) or 1.0
+        metrics = {}
+        for name, seconds in self.seconds.items():
+            metrics[f"step_{name}_ms"] = 1000 * seconds / steps
+            metrics[f"{name}_fraction"] = seconds / total
+        return metrics
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.label = torch.profiler.record_function(name) if timer.record else nullcontext()
+
+    def __enter__(self):
+        self.label.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer.sync:
+            torch.cuda.synchronize()
+        self.timer.seconds[self.name] += time.perf_counter() - self.started
+        self.label.__exit__(*exc)
+        return False
+
+# ------------------------------------------
+# Memory
+def peak_rss_mb():
+    """Peak RSS of this process and of its terminated children (e.g. loader workers), in MB."""
+    # ru_maxrss is in KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+# ------------------------------------------
+# torch.profiler trace of a few steps
+def step_profiler(trace_dir, active_steps, skip_steps=2):
+    """
+    Profiler recording `active_steps` steps after `skip_steps` skipped and one
+    warmup step; call .step() after each training step. The Chrome trace is
+    written to {trace_dir}/trace.json once the active steps are done.
+    """
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    os.makedirs(trace_dir, exist_ok=True)
+    return torch.profiler.profile(
+        activities=activities,
+        schedule=torch.profiler.schedule(wait=skip_steps, warmup=1, active=active_steps, repeat=1),
+        on_trace_ready=lambda prof: prof.export_chrome_trace(os.path.join(trace_dir, "trace.json")),
+        record_shapes=True,
+        profile_memory=True,
+    )
@@ -0,0 +1,168 @@
+import os
+import io
+import json
+import shutil
+import tempfile
+
+import numpy as np
+import torch
+from PIL import Image
+import torch.distributed as dist
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, Sampler, SequentialSampler
+from torch.utils.data.distributed import DistributedSampler
+
+from ml.dataset_cache import LABEL_MAP
+
+IMAGES_FILE = "images.npy"
+LABELS_FILE = "labels.npy"
+META_FILE = "meta.json"
+
+# ------------------------------------------
+# Offline preprocessing: shards -> one uint8 (N, 3, H, W) memory-mapped array
+def build_tensor_store(shard_dataset, store_dir, fingerprint, img_size=(224, 224), on_error=None, log_every=1000):
+    """
+    Decode and resize every sample of `shard_dataset` once and write them to
+    `store_dir` as a memory-mappable uint8 array, plus a label array and a
+    metadata file. Undecodable images are stored black (as PlantDataset does).
+    Built in a temporary directory, swapped in atomically.
+    """
+    n = len(shard_dataset)
+    width, height = img_size
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".tensor-store-")
+    try:
+        images = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, IMAGES_FILE), mode="w+", dtype=np.uint8, shape=(n, 3, height, width)
+        )
+        labels = np.empty(n, dtype=np.int64)
+        ids = []
+        for i in range(n):
+            sample = shard_dataset.samples[i]
+            try:
+                img = Image.open(io.BytesIO(shard_dataset.read_bytes(i))).convert("RGB")
+                # Same resampling as transforms.Resize on a PIL image
+                img = img.resize(img_size, Image.BILINEAR)
+                images[i] = np.asarray(img).transpose(2, 0, 1)
+            except Exception as e:
+                images[i] = 0
+                if on_error:
+                    on_error(sample["id"], e)
+            labels[i] = LABEL_MAP[sample["label"]]
+            ids.append(sample["id"])
+            if log_every and (i + 1) % log_every == 0:
+                print(f"{i + 1}/{n} images preprocessed")
+        images.flush()
+        del images
+        np.save(os.path.join(tmp_dir, LABELS_FILE), labels)
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump({"fingerprint": fingerprint, "n": n, "shape": [3, height, width], "ids": ids}, f)
+
+        old_dir = None
+        if os.path.exists(store_dir):
+            old_dir = tempfile.mkdtemp(dir=parent, prefix=".old-")
+            os.rename(store_dir, os.path.join(old_dir, "store"))
+        os.rename(tmp_dir, store_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load_meta(store_dir):
+    try:
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+# ------------------------------------------
+# Whole-batch augmentation and normalization
+class BatchTransform:
+    """uint8 (B, 3, H, W) -> float batch: scaling to [0, 1], optional flip and normalization."""
+
+    def __init__(self, hflip_p=0.0, mean=None, std=None):
+        self.hflip_p = hflip_p
+        self.mean = torch.tensor(mean).view(1, 3, 1, 1) if mean is not None else None
+        self.std = torch.tensor(std).view(1, 3, 1, 1) if std is not None else None
+
+    def __call__(self, x):
+        x = x.float().div_(255.0)
+        if self.hflip_p > 0:
+            flip = torch.rand(x.size(0)) < self.hflip_p
+            if flip.any():
+                x[flip] = x[flip].flip(-1)
+        if self.mean is not None:
+            x = x.sub_(self.mean).div_(self.std)
+        return x
+
+# ------------------------------------------
+# Dataset serving whole batches straight from the memory map
+class TensorStoreDataset(Dataset):
+    """
+    Indexed by a list of positions (one batch), returns (images, labels).
+    The array is memory-mapped lazily in each process, so DataLoader workers
+    share the page cache instead of decoding their own copy.
+    """
+
+    def __init__(self, store_dir, indices, batch_transform=None):
+        self.store_dir = store_dir
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.batch_transform = batch_transform or BatchTransform()
+        self._images = None
+        self._labels = None
+
+    def __len__(self):
+        return len(self.indices)
+
+    def _arrays(self):
+        if self._images is None:
+            self._images = np.load(os.path.join(self.store_dir, IMAGES_FILE), mmap_mode="r")
+            self._labels = np.load(os.path.join(self.store_dir, LABELS_FILE), mmap_mode="r")
+        return self._images, self._labels
+
+    def __getitem__(self, batch_positions):
+        images, labels = self._arrays()
+        rows = np.sort(self.indices[np.asarray(batch_positions)])
+        x = torch.from_numpy(images[rows])  # single gather out of the mmap
+        y = torch.from_numpy(labels[rows])
+        return self.batch_transform(x), y
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        state["_labels"] = None
+        return state
+
+
+class ShardSampler(Sampler):
+    """
+    Sequential, unpadded share of the dataset for this rank (every world_size-th
+    position). Unlike DistributedSampler nothing is duplicated, so per-rank
+    counts sum to exactly len(dataset): use it for evaluation.
+    """
+
+    def __init__(self, dataset, rank=None, world_size=None):
+        self.rank = dist.get_rank() if rank is None else rank
+        self.world_size = dist.get_world_size() if world_size is None else world_size
+        self.positions = range(self.rank, len(dataset), self.world_size)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+def make_store_loader(dataset, batch_size, shuffle, distributed=False, **loader_kwargs):
+    """
+    DataLoader yielding whole batches from a TensorStoreDataset (no per-sample collation).
+    Distributed: shuffled loaders use DistributedSampler, sequential ones ShardSampler.
+    """
+    if distributed:
+        base = DistributedSampler(dataset, shuffle=True) if shuffle else ShardSampler(dataset)
+    else:
+        base = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    sampler = BatchSampler(base, batch_size=batch_size, drop_last=False)
+    return DataLoader(dataset, sampler=sampler, batch_size=None, **loader_kwargs)
@@ -1,21 +1,35 @@
 #!/usr/bin/env python3
 import sys
 import os
+import copy
+import time
+import uuid
 import logging
+import tempfile
 from datetime import datetime
 from dotenv import load_dotenv
 
 import torch
+import torch.distributed as dist
+from contextlib import nullcontext
 from tqdm import tqdm
 import mlflow
 import mlflow.pytorch
 from mlflow.tracking import MlflowClient
-import boto3
-from botocore.client import Config
 from airflow.decorators import task
 
+from data_access import get_s3_client
 from ml.model import build_model
-from ml.data_loader import get_dataloaders
+from ml.data_loader import (
+    BATCH_SIZE, DATA_SPLIT_SEED, available_cpus, get_dataloaders, get_datasets, loader_options,
+    make_dataloaders, set_epoch,
+)
+from ml.dataset_cache import ShardDataset
+from ml.feature_store import FeatureStore, backbone_version, dataset_features
+from ml.engine import Engine, set_threads
+from ml.checkpoint import CheckpointStore, EarlyStopping, snapshot
+from ml.profiling import PhaseTimer, peak_rss_mb, step_profiler
+from ml.export import export_onnx, OnnxRuntimeModel, quantize_static, parity_report
 
 # ─── CHARGEMENT DU .env ─────────────────────────────────────────
 load_dotenv()
@@ -29,36 +43,68 @@ logger = logging.getLogger(__name__)
 
 # ─── VARIABLES D'ENVIRONNEMENT ────────────────────────────────
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI")
-MLFLOW_S3_ENDPOINT_URL = os.getenv("MLFLOW_S3_ENDPOINT_URL")
-AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 BUCKET_NAME = os.getenv("MLFLOW_S3_BUCKET", "mlflow-artifacts")
 EXPERIMENT_NAME = os.getenv("MLFLOW_EXPERIMENT", "my_training_experiment")
+# Backends d'inférence CPU exportés et vérifiés après l'entraînement
+EXPORT_BACKENDS = [b for b in os.getenv("EXPORT_BACKENDS", "torchscript,onnx,int8").split(",") if b]
+CALIBRATION_BATCHES = int(os.getenv("CALIBRATION_BATCHES", "10"))
+# "finetune" : ResNet18 complet ; "frozen" : backbone figé, seule la tête fc est entraînée
+TRAINING_MODE = os.getenv("TRAINING_MODE", "finetune")
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "/opt/airflow/data/features")
+FROZEN_HEAD_LR = float(os.getenv("FROZEN_HEAD_LR", "1e-3"))
+# Moteur d'entraînement rapide (mode "finetune"), chaque option activable séparément
+TRAIN_CHANNELS_LAST = os.getenv("TRAIN_CHANNELS_LAST", "0") == "1"
+TRAIN_BF16 = os.getenv("TRAIN_BF16", "0") == "1"
+TRAIN_COMPILE = os.getenv("TRAIN_COMPILE", "0") == "1"
+# 0 = valeur par défaut de torch
+TRAIN_NUM_THREADS = int(os.getenv("TRAIN_NUM_THREADS", "0"))
+TRAIN_INTEROP_THREADS = int(os.getenv("TRAIN_INTEROP_THREADS", "0"))
+# Checkpoints dans Minio (BUCKET_NAME), repris automatiquement au retry de la tâche
+CHECKPOINT_PREFIX = os.getenv("CHECKPOINT_PREFIX", "checkpoints")
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "1"))  # en époques, 0 = désactivé
+# Arrêt anticipé après N époques sans amélioration de val_acc (0 = désactivé)
+EARLY_STOPPING_PATIENCE = int(os.getenv("EARLY_STOPPING_PATIENCE", "3"))
+EARLY_STOPPING_MIN_DELTA = float(os.getenv("EARLY_STOPPING_MIN_DELTA", "0"))
+# Trace torch.profiler de N pas de la première époque, après TRAIN_PROFILE_SKIP pas (0 = désactivé)
+TRAIN_PROFILE_STEPS = int(os.getenv("TRAIN_PROFILE_STEPS", "0"))
+TRAIN_PROFILE_SKIP = int(os.getenv("TRAIN_PROFILE_SKIP", "2"))
+
+# Entraînement distribué (torchrun) : seul le rang 0 journalise dans MLflow et publie le modèle
+IS_MAIN_PROCESS = int(os.getenv("RANK", "0")) == 0
+DIST_BACKEND = os.getenv("DIST_BACKEND", "gloo")
 
 # Ne pas hardcoder les URIs dans le code
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-mlflow.set_experiment(EXPERIMENT_NAME)
+if IS_MAIN_PROCESS:
+    mlflow.set_experiment(EXPERIMENT_NAME)
 
 
-def get_s3_client():
+def init_distributed():
     """
-    Initialise et retourne un client S3/MinIO configuré.
+    Sous torchrun (WORLD_SIZE > 1), rejoint le groupe de processus et retourne
+    la taille du monde ; 1 en exécution simple.
     """
-    try:
-        client = boto3.client(
-            's3',
-            endpoint_url=MLFLOW_S3_ENDPOINT_URL,
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            config=Config(signature_version='s3v4'),
-            region_name=AWS_REGION
-        )
-        logger.info("Client S3 initialisé")
-        return client
-    except Exception as e:
-        logger.error("Échec de l'initialisation du client S3", exc_info=e)
-        sys.exit(1)
+    world_size = int(os.getenv("WORLD_SIZE", "1"))
+    if world_size > 1 and not dist.is_initialized():
+        dist.init_process_group(backend=DIST_BACKEND)
+        logger.info(f"Rang {dist.get_rank()}/{world_size} initialisé ({DIST_BACKEND})")
+    return world_size
+
+
+def checkpoint_prefix():
+    """
+    Emplacement des checkpoints de l'exécution courante : stable entre les
+    tentatives d'une même exécution du DAG (AIRFLOW_CTX_*), ou TRAIN_RUN_KEY.
+    Sans l'un ou l'autre (lancement manuel), une clé neuve est générée :
+    l'exécution repart de zéro au lieu de reprendre le checkpoint d'une autre.
+    """
+    run_key = os.getenv("TRAIN_RUN_KEY") or "/".join(
+        filter(None, [os.getenv("AIRFLOW_CTX_DAG_ID"), os.getenv("AIRFLOW_CTX_DAG_RUN_ID")])
+    )
+    if not run_key:
+        run_key = f"local/{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        logger.info(f"Checkpoints sous la clé '{run_key}' (TRAIN_RUN_KEY={run_key} pour reprendre)")
+    return f"{CHECKPOINT_PREFIX}/{TRAINING_MODE}/{run_key}"
 
 
 def ensure_bucket(client, bucket_name):
@@ -78,85 +124,323 @@ def ensure_bucket(client, bucket_name):
             sys.exit(1)
 
 
+def export_inference_backends(model, train_loader, val_loader):
+    """
+    Exporte les backends d'inférence CPU optimisés utilisés par l'API
+    (INFERENCE_BACKEND) comme artefacts du run, et journalise pour chacun
+    sa parité de précision face au modèle fp32 sur le split de validation.
+    """
+    if not EXPORT_BACKENDS:
+        return
+
+    reference = copy.deepcopy(model).cpu().eval()
+    val_batches = [(imgs, labels) for imgs, labels in val_loader]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in EXPORT_BACKENDS:
+            try:
+                path = None
+                if backend == "torchscript":
+                    # L'API dérive ce backend du modèle scripté déjà journalisé
+                    scripted = torch.jit.script(copy.deepcopy(reference)).eval()
+                    candidate = torch.jit.optimize_for_inference(torch.jit.freeze(scripted))
+                elif backend == "onnx":
+                    path = export_onnx(reference, os.path.join(tmp, "model.onnx"))
+                    candidate = OnnxRuntimeModel(path)
+                elif backend == "int8":
+                    calib = [imgs for _, (imgs, _) in zip(range(CALIBRATION_BATCHES), train_loader)]
+                    candidate = quantize_static(reference, calib)
+                    path = os.path.join(tmp, "model.pt")
+                    candidate.save(path)
+                else:
+                    logger.warning(f"Backend d'export inconnu : '{backend}'")
+                    continue
+
+                if path:
+                    mlflow.log_artifact(path, artifact_path=backend)
+                report = parity_report(reference, candidate, val_batches)
+                mlflow.log_metrics({f"parity_{backend}_{k}": v for k, v in report.items()})
+                logger.info(
+                    f"Backend '{backend}' : acc={report['acc']:.4f} "
+                    f"(fp32={report['ref_acc']:.4f}), accord={report['agreement']:.4f}"
+                )
+            except Exception as e:
+                logger.error(f"Export du backend '{backend}' impossible", exc_info=e)
+
+
+def log_epoch(epoch, train_loss, train_acc, val_loss, val_acc):
+    if not IS_MAIN_PROCESS:
+        return
+    logger.info(f"Train loss: {train_loss:.4f}, acc: {train_acc:.4f}")
+    logger.info(f"Val   loss: {val_loss:.4f}, acc: {val_acc:.4f}")
+
+    mlflow.log_metrics(
+        {"train_loss": train_loss, "train_acc": train_acc,
+         "val_loss": val_loss, "val_acc": val_acc},
+        step=epoch
+    )
+
+
+def log_step_timings(epoch, timer, images, elapsed):
+    """
+    Débit, temps moyen par pas de chaque phase (attente du loader, transfert
+    vers le device, forward, backward, optimiseur) et pic de RSS de l'époque.
+    En distribué, les temps sont ceux du rang 0 et le débit est global.
+    """
+    rss, rss_children = peak_rss_mb()
+    metrics = timer.summary()
+    metrics.update({"train_images_per_s": images / elapsed,
+                    "peak_rss_mb": rss, "peak_rss_children_mb": rss_children})
+    mlflow.log_metrics(metrics, step=epoch)
+    logger.info(
+        f"Débit d'entraînement : {images / elapsed:.1f} images/s, pic RSS {rss:.0f} Mo ; par pas : "
+        + ", ".join(f"{name} {metrics[f'step_{name}_ms']:.1f} ms" for name in timer.seconds)
+    )
+    if metrics["data_wait_fraction"] > 0.3:
+        logger.warning(
+            f"{metrics['data_wait_fraction']:.0%} du temps passé à attendre le loader : "
+            "l'entraînement est limité par les données, pas par le calcul"
+        )
+
+
+def log_profiler_trace(profiler, trace_dir):
+    """Trace Chrome et tableau des opérateurs les plus coûteux en artefacts MLflow."""
+    trace = os.path.join(trace_dir, "trace.json")
+    if not os.path.exists(trace):
+        logger.warning("Trace du profiler non écrite : époque plus courte que les pas demandés")
+        return
+    mlflow.log_artifact(trace, artifact_path="profiler")
+    mlflow.log_text(
+        profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=30),
+        "profiler/top_ops.txt",
+    )
+
+
+def train_finetune(model, criterion, optimizer, train_loader, val_loader, epochs, device,
+                   checkpoints=None, resume=None, distributed=False):
+    """
+    Entraîne le ResNet18 complet et charge dans `model` le meilleur état (val_acc).
+    Les options TRAIN_CHANNELS_LAST / TRAIN_BF16 / TRAIN_COMPILE sont
+    journalisées avec le débit (images/s) de chaque époque.
+
+    Un checkpoint (modèle, optimiseur, époque, meilleur état) est écrit dans
+    `checkpoints` toutes les CHECKPOINT_EVERY époques ; `resume` reprend
+    depuis le dernier. L'entraînement s'arrête après
+    EARLY_STOPPING_PATIENCE époques sans amélioration de val_acc.
+
+    Chaque époque journalise le temps par phase du pas d'entraînement ; avec
+    TRAIN_PROFILE_STEPS, une trace torch.profiler de la première époque est
+    ajoutée aux artefacts du run.
+
+    Avec `distributed`, le modèle est enveloppé dans DistributedDataParallel ;
+    les métriques étant globales, tous les rangs prennent les mêmes décisions.
+    """
+    stopper = EarlyStopping(EARLY_STOPPING_PATIENCE, EARLY_STOPPING_MIN_DELTA)
+    best_state = None
+    start_epoch = 0
+    if resume is not None:
+        model.load_state_dict(resume["model"])
+        optimizer.load_state_dict(resume["optimizer"])
+        best_state = resume["best_state"]
+        stopper.best = resume["best_val_acc"]
+        stopper.bad_epochs = resume["bad_epochs"]
+        start_epoch = resume["epoch"] + 1
+        logger.info(f"Reprise depuis le checkpoint de l'époque {start_epoch}/{epochs}")
+
+    engine = Engine(
+        model, device,
+        channels_last=TRAIN_CHANNELS_LAST, bf16=TRAIN_BF16, compile=TRAIN_COMPILE,
+        distributed=distributed,
+    )
+    if TRAIN_BF16 and not engine.bf16:
+        logger.warning("bfloat16 non supporté sur ce matériel, entraînement en fp32")
+    if resume is None and IS_MAIN_PROCESS:
+        mlflow.log_params({f"engine_{k}": v for k, v in engine.flags().items()})
+
+    for epoch in range(start_epoch, epochs):
+        if stopper.should_stop:
+            break
+        logger.info(f"Début de l'époque {epoch+1}/{epochs}")
+        set_epoch(train_loader, epoch)
+        # Phase d'entraînement (trace du profiler sur le rang 0, première époque seulement)
+        profile = IS_MAIN_PROCESS and TRAIN_PROFILE_STEPS > 0 and epoch == start_epoch
+        timer = PhaseTimer(device, record=profile)
+        with tempfile.TemporaryDirectory() as trace_dir:
+            with step_profiler(trace_dir, TRAIN_PROFILE_STEPS, TRAIN_PROFILE_SKIP) if profile else nullcontext() as profiler:
+                train_loss, train_acc, images, elapsed = engine.train_epoch(
+                    tqdm(train_loader, desc="Training"), criterion, optimizer, timer=timer, profiler=profiler
+                )
+            if profile:
+                log_profiler_trace(profiler, trace_dir)
+
+        # Phase de validation
+        val_loss, val_acc, _ = engine.evaluate(tqdm(val_loader, desc="Validating"), criterion)
+
+        log_epoch(epoch, train_loss, train_acc, val_loss, val_acc)
+        if IS_MAIN_PROCESS:
+            log_step_timings(epoch, timer, images, elapsed)
+
+        if stopper.step(val_acc):
+            # Copie figée : state_dict() référence les poids qui continuent d'évoluer
+            best_state = snapshot(model.state_dict())
+
+        last_epoch = epoch == epochs - 1 or stopper.should_stop
+        if IS_MAIN_PROCESS and checkpoints is not None and CHECKPOINT_EVERY and ((epoch + 1) % CHECKPOINT_EVERY == 0 or last_epoch):
+            checkpoints.save({
+                "epoch": epoch,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "best_state": best_state,
+                "best_val_acc": stopper.best,
+                "bad_epochs": stopper.bad_epochs,
+                "mlflow_run_id": mlflow.active_run().info.run_id,
+            })
+
+        if stopper.should_stop and IS_MAIN_PROCESS:
+            logger.info(
+                f"Arrêt anticipé : pas d'amélioration de val_acc depuis {stopper.bad_epochs} époques "
+                f"(meilleure : {stopper.best:.4f})"
+            )
+            mlflow.log_metric("stopped_epoch", epoch)
+
+    engine.finalize()
+    model.load_state_dict(best_state)
+
+
+def train_frozen_head(model, criterion, epochs, device, lr=FROZEN_HEAD_LR):
+    """
+    Mode "frozen" : le backbone pré-entraîné est figé. Ses features 512-d sont
+    calculées une seule fois par image et conservées dans FEATURE_STORE_DIR
+    (clé : hash de l'image + version du backbone) ; seule la couche fc est
+    entraînée sur ces features. Le meilleur fc (val_acc) est chargé dans
+    `model`, qui reste un modèle complet. Retourne les loaders train/val du
+    même découpage (pour l'export des backends).
+    """
+    train_dataset, val_dataset = get_datasets(store_dir=None)
+    if not isinstance(train_dataset, ShardDataset):
+        raise RuntimeError("Le mode 'frozen' nécessite le dataset matérialisé (materialize_dataset.py)")
+
+    model.eval()
+    store = FeatureStore(FEATURE_STORE_DIR, backbone_version(model))
+    started = time.perf_counter()
+    options = loader_options()
+    train_x, train_y, computed_train = dataset_features(model, train_dataset, store, device=device, **options)
+    val_x, val_y, computed_val = dataset_features(model, val_dataset, store, device=device, **options)
+    computed = computed_train + computed_val
+    extract_s = time.perf_counter() - started
+    logger.info(
+        f"Features backbone {store.version} : {computed} calculées, "
+        f"{len(train_x) + len(val_x) - computed} lues depuis le cache, en {extract_s:.1f}s"
+    )
+    mlflow.log_metrics({"features_computed": computed, "feature_extract_s": extract_s})
+
+    train_x, train_y = train_x.to(device), train_y.to(device)
+    val_x, val_y = val_x.to(device), val_y.to(device)
+    head = model.model.fc
+    optimizer = torch.optim.Adam(head.parameters(), lr=lr)
+    mlflow.log_params({"backbone_version": store.version, "lr": lr,
+                       "optimizer": optimizer.__class__.__name__, "batch_size": BATCH_SIZE})
+    stopper = EarlyStopping(EARLY_STOPPING_PATIENCE, EARLY_STOPPING_MIN_DELTA)
+    best_state = None
+
+    for epoch in range(epochs):
+        if stopper.should_stop:
+            break
+        head.train()
+        train_loss = 0.0
+        train_correct = 0
+        for idx in torch.randperm(len(train_x), device=device).split(BATCH_SIZE):
+            optimizer.zero_grad()
+            outputs = head(train_x[idx])
+            loss = criterion(outputs, train_y[idx])
+            loss.backward()
+            optimizer.step()
+            train_loss += loss.item() * len(idx)
+            train_correct += (outputs.argmax(1) == train_y[idx]).sum().item()
+
+        head.eval()
+        with torch.no_grad():
+            outputs = head(val_x)
+            val_loss = criterion(outputs, val_y).item()
+            val_acc = (outputs.argmax(1) == val_y).float().mean().item()
+
+        log_epoch(epoch, train_loss / len(train_x), train_correct / len(train_x), val_loss, val_acc)
+
+        if stopper.step(val_acc):
+            best_state = snapshot(head.state_dict())
+
+    head.load_state_dict(best_state)
+    return make_dataloaders(train_dataset, val_dataset)
+
+
 def train_model(epochs: int = 10, lr: float = 1e-4):
     """
     Entraîne le modèle et le publie sur MLflow avec gestion du Model Registry.
+    Lancé par torchrun avec plusieurs processus, l'entraînement est réparti
+    (DistributedDataParallel, gloo) et seul le rang 0 journalise et publie.
     """
+    world_size = init_distributed()
+    distributed = world_size > 1
+    if distributed and TRAINING_MODE == "frozen":
+        raise RuntimeError("Le mode 'frozen' ne s'exécute pas en distribué (lancer sans torchrun)")
+
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     logger.info(f"Utilisation du device: {device}")
+    num_threads = TRAIN_NUM_THREADS
+    if distributed and not num_threads:
+        # Les cœurs du nœud sont partagés entre ses processus locaux
+        num_threads = max(1, available_cpus() // int(os.getenv("LOCAL_WORLD_SIZE", "1")))
+    intra_op, inter_op = set_threads(num_threads, TRAIN_INTEROP_THREADS)
+    logger.info(f"Threads torch : {intra_op} intra-op, {inter_op} inter-op")
 
-    # Préparation modèle et data
+    # Préparation modèle (les données dépendent du mode d'entraînement)
     model, criterion, optimizer = build_model(lr=lr, device=device)
-    train_loader, val_loader = get_dataloaders()
 
     s3 = get_s3_client()
-    ensure_bucket(s3, BUCKET_NAME)
+    if IS_MAIN_PROCESS:
+        ensure_bucket(s3, BUCKET_NAME)
 
-    best_val_acc = 0.0
-    best_state = None
+    # Reprise éventuelle d'une tentative précédente (même run MLflow)
+    checkpoints = CheckpointStore(s3, BUCKET_NAME, checkpoint_prefix()) if TRAINING_MODE != "frozen" else None
+    resume = checkpoints.load(map_location=device) if checkpoints else None
 
     run_name = f"train_{datetime.now():%Y-%m-%d_%H-%M-%S}"
-    with mlflow.start_run(run_name=run_name):
-        mlflow.log_params({"epochs": epochs, "lr": lr, "optimizer": optimizer.__class__.__name__})
-
-        for epoch in range(epochs):
-            logger.info(f"Début de l'époque {epoch+1}/{epochs}")
-            # Phase d'entraînement
-            model.train()
-            train_loss = 0.0
-            train_correct = 0
-            for imgs, labels in tqdm(train_loader, desc="Training"):
-                imgs, labels = imgs.to(device), labels.to(device)
-                optimizer.zero_grad()
-                outputs = model(imgs)
-                loss = criterion(outputs, labels)
-                loss.backward()
-                optimizer.step()
-
-                train_loss += loss.item() * imgs.size(0)
-                train_correct += (outputs.argmax(1) == labels).sum().item()
-
-            # Phase de validation
-            val_loss = 0.0
-            val_correct = 0
-            model.eval()
-            with torch.no_grad():
-                for imgs, labels in tqdm(val_loader, desc="Validating"):
-                    imgs, labels = imgs.to(device), labels.to(device)
-                    outputs = model(imgs)
-                    loss = criterion(outputs, labels)
-                    val_loss += loss.item() * imgs.size(0)
-                    val_correct += (outputs.argmax(1) == labels).sum().item()
-
-            # Calcul métriques
-            n_train = len(train_loader.dataset)
-            n_val = len(val_loader.dataset)
-            train_loss /= n_train
-            train_acc = train_correct / n_train
-            val_loss /= n_val
-            val_acc = val_correct / n_val
-
-            logger.info(f"Train loss: {train_loss:.4f}, acc: {train_acc:.4f}")
-            logger.info(f"Val   loss: {val_loss:.4f}, acc: {val_acc:.4f}")
-
-            mlflow.log_metrics(
-                {"train_loss": train_loss, "train_acc": train_acc,
-                 "val_loss": val_loss, "val_acc": val_acc},
-                step=epoch
-            )
+    run_args = {"run_id": resume["mlflow_run_id"]} if resume else {"run_name": run_name}
+    with mlflow.start_run(**run_args) if IS_MAIN_PROCESS else nullcontext():
+        if resume is None and IS_MAIN_PROCESS:
+            # lr / optimiseur : journalisés par chaque mode avec les valeurs réellement utilisées
+            mlflow.log_params({"epochs": epochs, "training_mode": TRAINING_MODE,
+                               "num_threads": intra_op, "interop_threads": inter_op,
+                               "early_stopping_patience": EARLY_STOPPING_PATIENCE,
+                               "world_size": world_size})
+            if TRAINING_MODE != "frozen":
+                mlflow.log_params({"lr": lr, "optimizer": optimizer.__class__.__name__,
+                                   "profile_steps": TRAIN_PROFILE_STEPS})
 
-            if val_acc > best_val_acc:
-                best_val_acc = val_acc
-                best_state = model.state_dict()
+        if TRAINING_MODE == "frozen":
+            train_loader, val_loader = train_frozen_head(model, criterion, epochs, device)
+        else:
+            train_loader, val_loader = get_dataloaders(distributed=distributed)
+            train_finetune(model, criterion, optimizer, train_loader, val_loader, epochs, device,
+                           checkpoints=checkpoints, resume=resume, distributed=distributed)
 
-        # Logging du meilleur modèle
-        model.load_state_dict(best_state)
+        if distributed:
+            dist.barrier()
+            dist.destroy_process_group()
+            if not IS_MAIN_PROCESS:
+                return
+            # Export sur le split de validation complet (même découpage que l'entraînement)
+            train_loader, val_loader = make_dataloaders(*get_datasets(random_state=DATA_SPLIT_SEED))
+
+        # Logging du meilleur modèle (toujours le modèle complet, scripté)
         scripted = torch.jit.script(model)
         mlflow.pytorch.log_model(
             pytorch_model=scripted,
             artifact_path="model",
             code_paths=None  
         )
+        export_inference_backends(model, train_loader, val_loader)
+
         run_id = mlflow.active_run().info.run_id
         logged_model_uri = f"runs:/{run_id}/model"
 
@@ -177,6 +461,10 @@ def train_model(epochs: int = 10, lr: float = 1e-4):
         )
         logger.info(f"Modèle promu en Production")
 
+    # Exécution terminée : une nouvelle tentative ne doit pas reprendre ce checkpoint
+    if checkpoints is not None:
+        checkpoints.delete()
+
 
 if __name__ == "__main__":
     train_model()
@@ -0,0 +1,90 @@
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp")
+
+# Erreurs possibles à la lecture d'une entrée (archive tronquée, CRC, flux compressé corrompu)
+READ_ERRORS = (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError)
+
+
+class UnreadableMember(ValueError):
+    """Entrée d'archive illisible, renvoyée à la place de ses bytes."""
+
+
+def _is_image(name):
+    base = os.path.basename(name)
+    return not base.startswith(".") and base.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _read_member(name, read):
+    try:
+        return read()
+    except READ_ERRORS as e:
+        return UnreadableMember(f"Entrée illisible '{name}' : {e}")
+
+
+def iter_archive(data, max_items=None, max_members=None, max_bytes=None):
+    """
+    Itère sur les images d'une archive zip ou tar (éventuellement compressée)
+    et renvoie des couples (nom, bytes). Les entrées non-images sont ignorées ;
+    une image illisible est renvoyée avec une UnreadableMember à la place de
+    ses bytes.
+
+    Lève ValueError si l'archive est illisible ou dépasse `max_items` images,
+    `max_members` entrées ou `max_bytes` octets décompressés (tailles déclarées,
+    vérifiées avant lecture : zip et tar ne lisent jamais au-delà).
+    """
+    count = 0
+    total = 0
+
+    def check(members, size):
+        nonlocal count, total
+        if max_members is not None and members > max_members:
+            raise ValueError(f"Archive trop volumineuse (> {max_members} entrées)")
+        count += 1
+        total += size
+        if max_items is not None and count > max_items:
+            raise ValueError(f"Archive trop volumineuse (> {max_items} images)")
+        if max_bytes is not None and total > max_bytes:
+            raise ValueError(f"Archive trop volumineuse (> {max_bytes} octets décompressés)")
+
+    buf = io.BytesIO(data)
+    if zipfile.is_zipfile(buf):
+        buf.seek(0)
+        try:
+            zf = zipfile.ZipFile(buf)
+        except READ_ERRORS as e:
+            raise ValueError(f"Archive illisible : {e}")
+        with zf:
+            infos = zf.infolist()
+            if max_members is not None and len(infos) > max_members:
+                raise ValueError(f"Archive trop volumineuse (> {max_members} entrées)")
+            for info in infos:
+                if info.is_dir() or not _is_image(info.filename):
+                    continue
+                check(len(infos), info.file_size)
+                yield info.filename, _read_member(info.filename, lambda: zf.read(info))
+        return
+
+    buf.seek(0)
+    try:
+        tf = tarfile.open(fileobj=buf, mode="r:*")
+    except tarfile.TarError as e:
+        raise ValueError(f"Archive illisible : {e}")
+    with tf:
+        members = 0
+        try:
+            for member in tf:
+                members += 1
+                if max_members is not None and members > max_members:
+                    raise ValueError(f"Archive trop volumineuse (> {max_members} entrées)")
+                if not member.isfile() or not _is_image(member.name):
+                    continue
+                check(members, member.size)
+                yield member.name, _read_member(member.name, lambda: tf.extractfile(member).read())
+        except READ_ERRORS as e:
+            # En-tête suivant illisible : le flux tar ne peut pas être repris
+            raise ValueError(f"Archive illisible : {e}")
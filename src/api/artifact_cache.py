@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("prefer-registry", "offline")
+
+
+def tree_checksum(path):
+    """SHA-256 d'un fichier, ou d'un répertoire (chemins relatifs triés + contenus)."""
+    digest = hashlib.sha256()
+    if os.path.isfile(path):
+        files = [(os.path.basename(path), path)]
+    else:
+        files = []
+        for root, _, names in os.walk(path):
+            for name in names:
+                full = os.path.join(root, name)
+                files.append((os.path.relpath(full, path), full))
+        files.sort()
+    for rel, full in files:
+        digest.update(rel.encode())
+        digest.update(b"\0")
+        with open(full, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelArtifactCache:
+    """
+    Cache disque des artefacts de modèle, adressé par contenu et partageable
+    entre pods via un volume.
+
+    - objects/<sha256>/...                       : artefacts téléchargés (immuables)
+    - refs/<nom>/<version>/<artefact>.json       : version -> checksum
+    - refs/<nom>/stages/<stage>.json             : dernière version résolue pour un stage
+
+    Les écritures passent par un répertoire temporaire puis un renommage
+    atomique, ce qui rend les téléchargements concurrents sûrs.
+    """
+
+    def __init__(self, root, mode="prefer-registry", verify=True):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Mode de cache inconnu '{mode}' (attendu : {', '.join(CACHE_MODES)})")
+        self.root = root
+        self.mode = mode
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        for sub in ("objects", "refs", "tmp"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    # ─── RÉFÉRENCES ───────────────────────────────────────────
+    def _ref_path(self, *parts):
+        return os.path.join(self.root, "refs", *parts) + ".json"
+
+    def _read_ref(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_ref(self, path, ref):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        with os.fdopen(fd, "w") as f:
+            json.dump(ref, f)
+        os.replace(tmp, path)
+
+    # ─── VERSIONS ─────────────────────────────────────────────
+    def resolve_version(self, name, stage, resolve_fn):
+        """
+        Résout `stage` en version via `resolve_fn` (Model Registry) et mémorise
+        le résultat. Si le registry est injoignable — ou en mode "offline" —
+        la dernière version résolue est servie depuis le cache.
+        """
+        path = self._ref_path(name, "stages", stage)
+        if self.mode != "offline":
+            try:
+                version = resolve_fn()
+                if version is not None:
+                    self._write_ref(path, {"version": version, "resolved_at": time.time()})
+                return version
+            except Exception as e:
+                ref = self._read_ref(path)
+                if ref is None:
+                    raise
+                logger.warning(
+                    f"Registry injoignable ({e}) : version {ref['version']} servie depuis le cache"
+                )
+                return ref["version"]
+
+        ref = self._read_ref(path)
+        if ref is None:
+            raise RuntimeError(f"Aucune version en cache pour {name}/{stage} (mode offline)")
+        return ref["version"]
+
+    # ─── ARTEFACTS ────────────────────────────────────────────
+    def fetch(self, name, version, artifact, download_fn):
+        """
+        Chemin local de l'artefact `artifact` de `name` v`version`.
+        `download_fn(dst_dir)` télécharge l'artefact dans `dst_dir` et renvoie son chemin.
+        """
+        ref_path = self._ref_path(name, str(version), artifact.replace("/", "__"))
+        ref = self._read_ref(ref_path)
+        if ref is not None:
+            local = os.path.join(self.root, "objects", ref["checksum"], ref["relpath"])
+            if os.path.exists(local) and (not self.verify or tree_checksum(local) == ref["checksum"]):
+                self.hits += 1
+                logger.info(f"Artefact {name} v{version} '{artifact}' servi depuis le cache")
+                return local
+            logger.warning(f"Entrée de cache invalide pour {name} v{version} '{artifact}', re-téléchargement")
+
+        if self.mode == "offline":
+            raise RuntimeError(f"Artefact {name} v{version} '{artifact}' absent du cache (mode offline)")
+
+        self.misses += 1
+        started = time.perf_counter()
+        tmp = tempfile.mkdtemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            downloaded = download_fn(tmp)
+            checksum = tree_checksum(downloaded)
+            relpath = os.path.relpath(downloaded, tmp)
+            target = os.path.join(self.root, "objects", checksum)
+            self._store(tmp, target, relpath, checksum)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        self._write_ref(ref_path, {"checksum": checksum, "relpath": relpath, "stored_at": time.time()})
+        logger.info(
+            f"Artefact {name} v{version} '{artifact}' mis en cache ({checksum[:12]}) "
+            f"en {time.perf_counter() - started:.1f}s"
+        )
+        return os.path.join(target, relpath)
+
+    def _store(self, tmp, target, relpath, checksum):
+        """
+        Renomme `tmp` en `target`. Un objet déjà présent est conservé s'il est
+        intact (autre pod / processus) ; corrompu, il est mis en quarantaine
+        puis remplacé. Lève RuntimeError si l'objet final reste invalide.
+        """
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            if tree_checksum(os.path.join(target, relpath)) == checksum:
+                shutil.rmtree(tmp, ignore_errors=True)
+                return
+            logger.warning(f"Objet {checksum[:12]} corrompu dans le cache, remplacement")
+            quarantine = tempfile.mkdtemp(dir=os.path.join(self.root, "tmp"), prefix="corrupt-")
+            try:
+                os.rename(target, os.path.join(quarantine, "object"))
+            except FileNotFoundError:
+                pass  # déjà retiré par un autre processus
+            shutil.rmtree(quarantine, ignore_errors=True)
+            try:
+                os.rename(tmp, target)
+            except OSError:
+                # Un autre processus vient de le réécrire : vérifié ci-dessous
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        local = os.path.join(target, relpath)
+        if not os.path.exists(local) or tree_checksum(local) != checksum:
+            raise RuntimeError(f"Objet {checksum[:12]} invalide après mise en cache ({local})")
+
+    def metrics(self):
+        return {"root": self.root, "mode": self.mode, "hits": self.hits, "misses": self.misses}
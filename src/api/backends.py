@@ -0,0 +1,160 @@
+import os
+import logging
+import tempfile
+import zipfile
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("pytorch", "torchscript", "onnx", "int8")
+
+# Artefacts exportés par train_model.py à côté du modèle MLflow
+MODEL_ARTIFACT = "model"
+ONNX_ARTIFACT = "onnx/model.onnx"
+INT8_ARTIFACT = "int8/model.pt"
+
+_ARTIFACTS = {
+    "pytorch": MODEL_ARTIFACT,
+    "torchscript": MODEL_ARTIFACT,
+    "onnx": ONNX_ARTIFACT,
+    "int8": INT8_ARTIFACT,
+}
+
+
+# ─── RÉSOLUTION DES ARTEFACTS ─────────────────────────────────
+def _parse_model_uri(model_uri):
+    """`models:/<nom>/<version ou stage>` -> (nom, référence)."""
+    return model_uri[len("models:/"):].split("/", 1)
+
+
+def _run_id_for(model_uri):
+    """Retrouve le run MLflow d'une URI `models:/<nom>/<version ou stage>`."""
+    from mlflow.tracking import MlflowClient
+
+    name, ref = _parse_model_uri(model_uri)
+    client = MlflowClient()
+    if ref.isdigit():
+        return client.get_model_version(name, ref).run_id
+    versions = client.get_latest_versions(name, stages=[ref])
+    if not versions:
+        raise RuntimeError(f"Aucune version '{ref}' pour le modèle '{name}'")
+    return versions[0].run_id
+
+
+def _download(model_uri, artifact, dst_dir):
+    """Télécharge l'artefact `artifact` de `model_uri` dans `dst_dir` et renvoie son chemin local."""
+    import mlflow.artifacts
+
+    if artifact == MODEL_ARTIFACT:
+        return mlflow.artifacts.download_artifacts(artifact_uri=model_uri, dst_path=dst_dir)
+    return mlflow.artifacts.download_artifacts(
+        run_id=_run_id_for(model_uri), artifact_path=artifact, dst_path=dst_dir
+    )
+
+
+def fetch_artifact(kind, model_uri, cache=None):
+    """
+    Emplacement de l'artefact nécessaire au backend `kind` : chemin local
+    (depuis `cache` s'il est fourni) ou, sans cache, URI MLflow du modèle.
+    """
+    if kind not in _ARTIFACTS:
+        raise ValueError(f"Backend inconnu '{kind}' (attendu : {', '.join(BACKENDS)})")
+    artifact = _ARTIFACTS[kind]
+    if cache is not None:
+        name, version = _parse_model_uri(model_uri)
+        return cache.fetch(name, version, artifact, lambda dst: _download(model_uri, artifact, dst))
+    if artifact == MODEL_ARTIFACT:
+        return model_uri
+    return _download(model_uri, artifact, tempfile.mkdtemp())
+
+
+# ─── BACKENDS ─────────────────────────────────────────────────
+class OnnxRuntimeModel:
+    """Session ONNX Runtime exposée comme un module : tenseur (N, C, H, W) -> logits."""
+
+    def __init__(self, path, num_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, batch):
+        out = self.session.run(None, {self.input_name: batch.contiguous().numpy()})[0]
+        return torch.from_numpy(out)
+
+
+def _torchscript_file(location):
+    """Fichier TorchScript d'un modèle MLflow local (data/model.pth), ou None."""
+    path = os.path.join(location, "data", "model.pth")
+    if not os.path.isfile(path) or not zipfile.is_zipfile(path):
+        return None
+    with zipfile.ZipFile(path) as zf:
+        if any("/code/" in name for name in zf.namelist()):
+            return path
+    return None
+
+
+def _load_pytorch(location):
+    # Modèle scripté en cache local : torch.jit.load évite d'importer mlflow
+    if os.path.isdir(location):
+        scripted = _torchscript_file(location)
+        if scripted is not None:
+            model = torch.jit.load(scripted, map_location="cpu")
+            model.eval()
+            return model
+
+    import mlflow.pytorch
+
+    model = mlflow.pytorch.load_model(location)
+    model.eval()
+    return model
+
+
+def _load_torchscript(location):
+    """Modèle TorchScript gelé puis optimisé pour l'inférence CPU."""
+    model = _load_pytorch(location)
+    if not isinstance(model, torch.jit.ScriptModule):
+        model = torch.jit.script(model)
+    model = torch.jit.freeze(model.eval())
+    return torch.jit.optimize_for_inference(model)
+
+
+def _load_onnx(location):
+    return OnnxRuntimeModel(location, num_threads=int(os.getenv("ORT_NUM_THREADS", "0")))
+
+
+def _load_int8(location):
+    """ResNet18 quantifié statiquement en int8 (calibré pendant l'entraînement)."""
+    engines = torch.backends.quantized.supported_engines
+    torch.backends.quantized.engine = "x86" if "x86" in engines else "fbgemm"
+    model = torch.jit.load(location, map_location="cpu")
+    model.eval()
+    return model
+
+
+_LOADERS = {
+    "pytorch": _load_pytorch,
+    "torchscript": _load_torchscript,
+    "onnx": _load_onnx,
+    "int8": _load_int8,
+}
+
+
+def load_backend(kind, location):
+    """
+    Charge le modèle situé en `location` (voir `fetch_artifact`) avec le
+    backend d'inférence `kind`. L'objet renvoyé s'appelle comme un module PyTorch.
+    """
+    if kind not in _LOADERS:
+        raise ValueError(f"Backend inconnu '{kind}' (attendu : {', '.join(BACKENDS)})")
+    model = _LOADERS[kind](location)
+    logger.info(f"Modèle chargé depuis {location} (backend '{kind}')")
+    return model
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, q):
+    """Percentile simple (méthode du rang le plus proche) sur une liste de valeurs."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+class MicroBatcher:
+    """
+    Ordonnanceur d'inférence par micro-lots.
+
+    Les requêtes sont déposées dans une file asyncio ; un worker unique les
+    regroupe en lots bornés par `max_batch_size` et `max_wait_ms`, exécute une
+    seule passe forward et renvoie à chaque appelant sa propre ligne de sortie.
+
+    `infer_fn` est une coroutine (N, C, H, W) -> (N, K), chargée de déporter le
+    calcul hors de la boucle d'événements (voir `executor.InferenceExecutor`).
+    """
+
+    def __init__(self, infer_fn, max_batch_size=16, max_wait_ms=5.0, max_queue_size=0, latency_window=1000):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+
+        self._queue = None
+        self._worker = None
+
+        # Métriques
+        self.batches_total = 0
+        self.items_total = 0
+        self.errors_total = 0
+        self.max_queue_depth = 0
+        self.batch_size_hist = Counter()
+        self._latencies = deque(maxlen=latency_window)
+        self._queue_waits = deque(maxlen=latency_window)
+
+    # ─── CYCLE DE VIE ─────────────────────────────────────────
+    async def start(self):
+        """Crée la file et démarre le worker dans la boucle courante."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Micro-batcher démarré (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.1f})"
+        )
+
+    async def stop(self):
+        """Arrête le worker et fait échouer les requêtes encore en attente."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while not self._queue.empty():
+            _, fut, _ = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("Micro-batcher arrêté"))
+        logger.info("Micro-batcher arrêté")
+
+    # ─── API PUBLIQUE ─────────────────────────────────────────
+    async def submit(self, x):
+        """
+        Dépose un tenseur (C, H, W) dans la file et attend la sortie
+        correspondante du modèle.
+        """
+        if self._worker is None:
+            raise RuntimeError("Micro-batcher non démarré")
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((x, fut, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return await fut
+
+    def metrics(self):
+        """Instantané des métriques de la file et des lots."""
+        latencies = list(self._latencies)
+        waits = list(self._queue_waits)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches_total": self.batches_total,
+            "items_total": self.items_total,
+            "errors_total": self.errors_total,
+            "avg_batch_size": self.items_total / self.batches_total if self.batches_total else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_size_hist.items())},
+            "queue_wait_ms": {
+                "p50": _percentile(waits, 50) * 1000,
+                "p99": _percentile(waits, 99) * 1000,
+            },
+            "latency_ms": {
+                "p50": _percentile(latencies, 50) * 1000,
+                "p99": _percentile(latencies, 99) * 1000,
+            },
+            "config": {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            },
+        }
+
+    # ─── WORKER ───────────────────────────────────────────────
+    async def _collect(self):
+        """Attend une première requête puis complète le lot jusqu'à la taille ou au délai max."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Vider d'abord ce qui est déjà disponible, sans attendre
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Les appelants déconnectés ont pu annuler leur future
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._queue_waits.append(started - enqueued)
+
+            try:
+                x = torch.stack([item[0] for item in batch])
+                out = await self.infer_fn(x)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'inférence d'un lot de {len(batch)}", exc_info=e)
+                self.errors_total += len(batch)
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            self.batches_total += 1
+            self.items_total += len(batch)
+            self.batch_size_hist[len(batch)] += 1
+            for i, (_, fut, enqueued) in enumerate(batch):
+                self._latencies.append(done - enqueued)
+                if not fut.done():
+                    fut.set_result(out[i])
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark de démarrage à froid : lance l'API (uvicorn) dans un sous-processus
+et mesure le temps entre le lancement du processus et la première réponse
+200 de /predict. Répété `--runs` fois, par exemple pour comparer un premier
+démarrage (cache vide) aux suivants (MODEL_CACHE_DIR déjà rempli), ou un
+démarrage avec MLflow arrêté.
+
+Exemple (depuis src/api) :
+    MODEL_CACHE_DIR=/tmp/model-cache python benchmarks/cold_start.py --image dandelion.jpg --runs 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+
+def measure(image_bytes, port, timeout):
+    api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=api_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"L'API s'est arrêtée (code {proc.returncode})")
+            try:
+                resp = requests.post(
+                    f"http://127.0.0.1:{port}/predict",
+                    files={"file": ("image.jpg", image_bytes, "image/jpeg")},
+                    timeout=5,
+                )
+                if resp.status_code == 200:
+                    elapsed = time.perf_counter() - started
+                    metrics = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=5).json()
+                    return elapsed, metrics.get("cold_start", {})
+            except requests.RequestException:
+                pass
+            time.sleep(0.1)
+        raise TimeoutError(f"Pas de /predict réussi en {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    for run in range(1, args.runs + 1):
+        elapsed, reported = measure(image_bytes, args.port, args.timeout)
+        print(
+            f"run {run}: premier /predict en {elapsed:.2f}s "
+            f"(modèle prêt : {reported.get('model_ready_s') or 0:.2f}s côté API)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrence de l'API : mesure la latence de /health au repos,
+puis pendant que /predict est saturé par N clients concurrents.
+
+Avec l'exécuteur hors boucle d'événements, la latence de /health doit rester
+stable sous charge.
+
+Exemple :
+    python benchmarks/concurrency.py --url http://localhost:8000 --image dandelion.jpg --concurrency 32
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def probe_health(base_url, duration, interval):
+    """Interroge /health en boucle et renvoie les latences (s)."""
+    latencies = []
+    session = requests.Session()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        session.get(f"{base_url}/health", timeout=30).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+def hammer_predict(base_url, image_bytes, stop, counters, lock):
+    """Envoie des /predict en continu jusqu'à `stop`."""
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            resp = session.post(
+                f"{base_url}/predict",
+                files={"file": ("image.jpg", image_bytes, "image/jpeg")},
+                timeout=60,
+            )
+            ok = resp.status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            counters["ok" if ok else "errors"] += 1
+            counters["latencies"].append(elapsed)
+
+
+def summarize(name, latencies):
+    print(
+        f"{name:<22} n={len(latencies):<6} "
+        f"p50={percentile(latencies, 50) * 1000:8.2f} ms  "
+        f"p99={percentile(latencies, 99) * 1000:8.2f} ms  "
+        f"mean={statistics.fmean(latencies) * 1000 if latencies else 0.0:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--image", required=True, help="Image envoyée à /predict")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="Durée de chaque phase (s)")
+    parser.add_argument("--interval", type=float, default=0.05, help="Intervalle entre deux /health (s)")
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    print(f"Phase 1 : /health au repos ({args.duration:.0f}s)")
+    idle = probe_health(args.url, args.duration, args.interval)
+
+    print(f"Phase 2 : /health avec /predict saturé ({args.concurrency} clients, {args.duration:.0f}s)")
+    stop = threading.Event()
+    lock = threading.Lock()
+    counters = {"ok": 0, "errors": 0, "latencies": []}
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(hammer_predict, args.url, image_bytes, stop, counters, lock)
+        started = time.perf_counter()
+        loaded = probe_health(args.url, args.duration, args.interval)
+        stop.set()
+    elapsed = time.perf_counter() - started
+
+    print()
+    summarize("/health (repos)", idle)
+    summarize("/health (sous charge)", loaded)
+    summarize("/predict", counters["latencies"])
+    print(f"/predict : {counters['ok']} ok, {counters['errors']} erreurs, {counters['ok'] / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
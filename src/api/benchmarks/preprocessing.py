@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark du prétraitement : compare le chemin torchvision d'origine
+(`preprocess_reference`) au chemin rapide (`preprocess_fast` : décodage JPEG
+réduit via PIL draft(), redimensionnement uint8, normalisation fusionnée)
+sur un corpus d'images de tailles variées.
+
+Parité : écart absolu max / moyen entre les deux tenseurs, et avec --model
+(modèle TorchScript, ex. l'artefact model/data/model.pth du run MLflow)
+l'accord top-1 des prédictions. Le mode "fast" ne doit être activé en
+production (PREPROCESS_MODE=fast) qu'avec un accord top-1 jugé suffisant
+sur des images réelles.
+
+Sans --images, un corpus JPEG synthétique est généré pour chaque taille.
+
+Exemple (depuis src/api) :
+    python benchmarks/preprocessing.py --repeat 20
+    python benchmarks/preprocessing.py --images ~/photos/*.jpg --model model.pth
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preprocessing import preprocess_fast, preprocess_reference  # noqa: E402
+
+SIZES = [(640, 480), (1280, 960), (1920, 1080), (3024, 4032), (4000, 3000)]
+
+
+def synthetic_jpeg(width, height, seed=0):
+    """JPEG synthétique (gradients + bruit) pour que la compression reste réaliste."""
+    rng = np.random.default_rng(seed)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([xs + 0 * ys, ys + 0 * xs, (xs + ys) / 2], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(noisy).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def time_fn(fn, data, repeat):
+    fn(data)  # échauffement
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="*", help="Images réelles à utiliser à la place du corpus synthétique")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--model", help="Modèle TorchScript pour mesurer l'accord top-1 des deux chemins")
+    args = parser.parse_args()
+    model = torch.jit.load(args.model, map_location="cpu").eval() if args.model else None
+
+    if args.images:
+        corpus = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                data = f.read()
+            corpus.append((os.path.basename(path), data))
+    else:
+        corpus = [(f"{w}x{h}", synthetic_jpeg(w, h)) for w, h in SIZES]
+
+    print(
+        f"{'image':<20} {'Ko':>8} {'référence ms':>14} {'rapide ms':>11} {'gain':>7} "
+        f"{'max |diff|':>11} {'moy |diff|':>11}"
+    )
+    total_ref = total_fast = 0.0
+    max_diff = 0.0
+    ref_inputs, fast_inputs = [], []
+    for name, data in corpus:
+        ref = time_fn(preprocess_reference, data, args.repeat)
+        fast = time_fn(preprocess_fast, data, args.repeat)
+        x_ref, x_fast = preprocess_reference(data), preprocess_fast(data)
+        diff = (x_ref - x_fast).abs()
+        max_diff = max(max_diff, diff.max().item())
+        ref_inputs.append(x_ref)
+        fast_inputs.append(x_fast)
+        total_ref += ref
+        total_fast += fast
+        print(
+            f"{name:<20} {len(data) / 1024:8.0f} {ref * 1000:14.2f} {fast * 1000:11.2f} "
+            f"{ref / fast:6.1f}x {diff.max().item():11.3f} {diff.mean().item():11.4f}"
+        )
+    print(f"{'total':<20} {'':>8} {total_ref * 1000:14.2f} {total_fast * 1000:11.2f} {total_ref / total_fast:6.1f}x")
+
+    print(f"\nParité : max |diff| = {max_diff:.3f} sur {len(corpus)} images")
+    if model is not None:
+        with torch.no_grad():
+            top1_ref = model(torch.stack(ref_inputs)).argmax(1)
+            top1_fast = model(torch.stack(fast_inputs)).argmax(1)
+        agreement = (top1_ref == top1_fast).float().mean().item()
+        print(f"Parité : accord top-1 = {agreement:.2%} ({int((top1_ref != top1_fast).sum())} désaccords)")
+
+
+if __name__ == "__main__":
+    main()
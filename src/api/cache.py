@@ -0,0 +1,171 @@
+import os
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Au-delà, le hachage est déporté dans un thread (hashlib relâche le GIL)
+HASH_INLINE_MAX_BYTES = 256 * 1024
+
+
+def content_hash(data):
+    """Empreinte rapide des bytes bruts envoyés (BLAKE2b 128 bits)."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# ─── NIVEAUX PARTAGÉS ─────────────────────────────────────────
+class RedisTier:
+    """Niveau partagé entre pods, adossé à Redis."""
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.ttl = ttl
+        self.name = "redis"
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(key, value, ex=self.ttl or None)
+
+
+class FileTier:
+    """Substitut local de Redis : un fichier par entrée, partageable via un volume."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = "file"
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key.replace(":", "_"))
+
+    def get(self, key):
+        try:
+            with open(self._file(key)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        target = self._file(key)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(value)
+        os.replace(tmp, target)
+
+
+def build_shared_tier(url, ttl=0):
+    """
+    Construit le niveau partagé depuis une URL (`redis://...` ou `file:///chemin`).
+    Renvoie None si l'URL est vide ou si le niveau est indisponible.
+    """
+    if not url:
+        return None
+    try:
+        if url.startswith(("redis://", "rediss://")):
+            return RedisTier(url, ttl)
+        if url.startswith("file://"):
+            return FileTier(url[len("file://"):])
+    except Exception as e:
+        logger.error(f"Cache partagé '{url}' indisponible, désactivé", exc_info=e)
+        return None
+    logger.error(f"Schéma de cache partagé non supporté : {url}")
+    return None
+
+
+# ─── CACHE DE PRÉDICTIONS ─────────────────────────────────────
+class PredictionCache:
+    """
+    Cache de prédictions à deux niveaux, indexé par (version du modèle, empreinte
+    des bytes). Un changement de version du modèle invalide donc naturellement
+    toutes les entrées.
+
+    - niveau 1 : LRU en mémoire, borné à `max_entries` ;
+    - niveau 2 (optionnel) : niveau partagé (Redis ou fichiers).
+    """
+
+    def __init__(self, max_entries=10000, shared=None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self._lru = OrderedDict()
+
+        # Compteurs
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_errors = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.shared is not None
+
+    @staticmethod
+    async def digest(data):
+        """Empreinte des bytes ; les gros fichiers sont hachés hors de la boucle d'événements."""
+        if len(data) > HASH_INLINE_MAX_BYTES:
+            return await asyncio.to_thread(content_hash, data)
+        return content_hash(data)
+
+    @staticmethod
+    def key(model_version, digest):
+        return f"{model_version}:{digest}"
+
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key):
+        value = self._lru.get(key)
+        if value is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                value = await asyncio.to_thread(self.shared.get, key)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Lecture du cache partagé impossible ({e})")
+            if value is not None:
+                self.shared_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        self._remember(key, value)
+        if self.shared is not None:
+            try:
+                await asyncio.to_thread(self.shared.set, key, value)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Écriture dans le cache partagé impossible ({e})")
+
+    def metrics(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "shared_tier": self.shared.name if self.shared is not None else None,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "shared_errors": self.shared_errors,
+            "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
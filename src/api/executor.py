@@ -0,0 +1,160 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import torch
+
+from backends import fetch_artifact, load_backend
+from preprocessing import preprocess
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process")
+
+# Modèle propre à chaque processus worker (mode "process")
+_worker_model = None
+
+
+# ─── FONCTIONS DES WORKERS (MODE PROCESS) ─────────────────────
+def _init_worker(backend, location, torch_threads):
+    """Initialiseur d'un processus worker : fixe les threads torch et précharge le modèle."""
+    global _worker_model
+
+    torch.set_num_threads(torch_threads)
+    _worker_model = load_backend(backend, location)
+    logging.getLogger(__name__).info(f"Worker {os.getpid()} : modèle chargé depuis {location}")
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def _worker_infer(batch):
+    with torch.no_grad():
+        return _worker_model(batch)
+
+
+# ─── MODÈLES CHARGÉS ──────────────────────────────────────────
+class ThreadModelHandle:
+    """Modèle chargé dans le processus de l'API, exécuté dans le pool de threads partagé."""
+
+    def __init__(self, pool, model):
+        self._pool = pool
+        self.model = model
+
+    def _forward(self, batch):
+        with torch.no_grad():
+            return self.model(batch)
+
+    async def infer(self, batch):
+        """Passe forward sur un lot (N, C, H, W) dans le pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._forward, batch)
+
+    def close(self):
+        self.model = None
+
+
+class ProcessModelHandle:
+    """Modèle préchargé dans chaque worker d'un pool de processus dédié à sa version."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    async def infer(self, batch):
+        """Passe forward sur un lot (N, C, H, W) dans un worker du pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _worker_infer, batch)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ─── EXÉCUTEUR ────────────────────────────────────────────────
+class InferenceExecutor:
+    """
+    Exécute les étapes CPU (décodage, prétraitement, passe forward) hors de la
+    boucle d'événements, afin que /health et les autres requêtes restent réactifs.
+
+    - "thread"  : pool de threads dans le processus de l'API ; chaque modèle
+      chargé est partagé par les threads.
+    - "process" : pool de processus par version de modèle, chaque worker
+      préchargeant le modèle avec le backend d'inférence `backend`.
+
+    `load(model_uri)` renvoie un handle exposant `infer(batch)` et `close()` ;
+    les artefacts passent par le cache disque `cache` s'il est fourni.
+    """
+
+    def __init__(self, kind="thread", workers=0, torch_threads=0, backend="pytorch", cache=None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Exécuteur inconnu '{kind}' (attendu : {', '.join(EXECUTOR_KINDS)})")
+        cpus = os.cpu_count() or 1
+        self.kind = kind
+        self.backend = backend
+        self.cache = cache
+
+        if kind == "thread":
+            # torch parallélise chaque passe forward sur `torch_threads` threads ;
+            # le pool est dimensionné sur la même valeur pour le décodage concurrent.
+            self.torch_threads = torch_threads or cpus
+            self.workers = workers or self.torch_threads
+        else:
+            # Chaque processus reçoit une part des cœurs pour éviter la sur-souscription.
+            self.workers = workers or max(1, cpus // max(1, torch_threads or 1))
+            self.torch_threads = torch_threads or max(1, cpus // self.workers)
+
+        self._pool = None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        if self.kind == "thread":
+            torch.set_num_threads(self.torch_threads)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        else:
+            # Pool sans modèle, réservé au décodage et au prétraitement
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        logger.info(
+            f"Exécuteur '{self.kind}' démarré ({self.workers} workers, "
+            f"{self.torch_threads} threads torch par passe)"
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def load(self, model_uri):
+        """Charge `model_uri` sans bloquer la boucle d'événements et renvoie son handle."""
+        # Téléchargé une seule fois, puis partagé par tous les workers
+        location = await asyncio.to_thread(fetch_artifact, self.backend, model_uri, self.cache)
+        if self.kind == "thread":
+            model = await asyncio.to_thread(load_backend, self.backend, location)
+            return ThreadModelHandle(self._pool, model)
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.backend, location, self.torch_threads),
+        )
+        # Force le démarrage des workers (et donc le chargement du modèle)
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(pool, _worker_ready) for _ in range(self.workers)
+            ))
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return ProcessModelHandle(pool)
+
+    async def preprocess(self, data):
+        """Décode et prétraite des bytes d'image dans le pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, preprocess, data)
@@ -1,14 +1,22 @@
 import os
-import io
+import time
+import asyncio
 from dotenv import load_dotenv
 import logging
+from typing import List, Optional
 
-from fastapi import FastAPI, File, HTTPException
-from fastapi.responses import JSONResponse
-from PIL import Image
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 import torch
-import torchvision.transforms as T
-import mlflow.pytorch
+
+from archives import UnreadableMember, iter_archive
+from artifact_cache import ModelArtifactCache
+from batching import MicroBatcher
+from cache import PredictionCache, build_shared_tier
+from executor import InferenceExecutor
+from model_manager import ModelManager
+from streaming import DuplexStreamingResponse, iter_frames, read_s3_object, stream_predictions
 
 # ─── CHARGEMENT DU .env ─────────────────────────────────────────
 # Charge les variables d'environnement depuis le fichier .env
@@ -22,6 +30,35 @@ aws_secret_access_key  = os.getenv("AWS_SECRET_ACCESS_KEY")
 model_name             = os.getenv("MLFLOW_MODEL_NAME", "DandelionGrassModel")
 model_stage            = os.getenv("MLFLOW_MODEL_STAGE", "Production")
 model_uri              = f"models:/{model_name}/{model_stage}"
+batch_max_size         = int(os.getenv("BATCH_MAX_SIZE", "16"))
+batch_max_wait_ms      = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+batch_max_queue        = int(os.getenv("BATCH_MAX_QUEUE", "0"))
+predict_batch_max_items = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "1024"))
+predict_batch_max_archive_members = int(os.getenv("PREDICT_BATCH_MAX_ARCHIVE_MEMBERS", "4096"))
+# Budget mémoire d'une requête /predict/batch : fichiers + archive + images décompressées
+predict_batch_max_bytes = int(os.getenv("PREDICT_BATCH_MAX_BYTES", str(512 * 1024 * 1024)))
+stream_max_in_flight   = int(os.getenv("STREAM_MAX_IN_FLIGHT", "64"))
+stream_max_frame_bytes = int(os.getenv("STREAM_MAX_FRAME_BYTES", str(20 * 1024 * 1024)))
+images_bucket          = os.getenv("BUCKET_NAME", "images")
+# Buckets lisibles par /predict/stream/s3 (séparés par des virgules), en plus de BUCKET_NAME
+stream_s3_allowed_buckets = {images_bucket} | {
+    b.strip() for b in os.getenv("STREAM_S3_ALLOWED_BUCKETS", "").split(",") if b.strip()
+}
+cache_max_entries      = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))  # 0 = LRU désactivé
+cache_shared_url       = os.getenv("PREDICTION_CACHE_SHARED_URL", "")  # redis://... ou file:///...
+cache_shared_ttl       = int(os.getenv("PREDICTION_CACHE_TTL", "86400"))
+inference_backend      = os.getenv("INFERENCE_BACKEND", "pytorch")  # pytorch | torchscript | onnx | int8
+inference_executor     = os.getenv("INFERENCE_EXECUTOR", "thread")  # thread | process
+inference_workers      = int(os.getenv("INFERENCE_WORKERS", "0"))   # 0 = auto
+torch_num_threads      = int(os.getenv("TORCH_NUM_THREADS", "0"))   # 0 = auto
+model_cache_dir        = os.getenv("MODEL_CACHE_DIR", "")  # vide = pas de cache disque
+model_cache_mode       = os.getenv("MODEL_CACHE_MODE", "prefer-registry")  # prefer-registry | offline
+model_cache_verify     = os.getenv("MODEL_CACHE_VERIFY", "true").lower() == "true"
+warmup_batch_sizes     = [int(b) for b in os.getenv("WARMUP_BATCH_SIZES", "").split(",") if b]  # vide = auto
+warmup_iterations      = int(os.getenv("WARMUP_ITERATIONS", "3"))
+model_poll_interval    = float(os.getenv("MODEL_POLL_INTERVAL", "60"))  # 0 = pas de rechargement
+
+LABELS = ("dandelion", "grass")
 
 # Définition des variables pour MLflow et AWS
 if mlflow_tracking_uri:
@@ -32,6 +69,9 @@ if aws_access_key_id:
     os.environ["AWS_ACCESS_KEY_ID"] = aws_access_key_id
 if aws_secret_access_key:
     os.environ["AWS_SECRET_ACCESS_KEY"] = aws_secret_access_key
+# Un registry injoignable doit échouer vite pour basculer sur le cache disque
+os.environ.setdefault("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "2")
+os.environ.setdefault("MLFLOW_HTTP_REQUEST_TIMEOUT", "10")
 
 # ─── CONFIGURATION DU LOGGING ─────────────────────────────────
 logging.basicConfig(
@@ -40,54 +80,359 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# ─── CHARGEMENT DU MODÈLE ─────────────────────────────────────
-try:
-    model = mlflow.pytorch.load_model(model_uri)
-    model.eval()
-    logger.info(f"Modèle chargé depuis: {model_uri}")
-except Exception as e:
-    logger.error(f"Impossible de charger le modèle {model_uri}", exc_info=e)
-    raise RuntimeError(f"Impossible de charger le modèle {model_uri}: {e}")
-
-# ─── PRÉTRAITEMENT ─────────────────────────────────────────────
-transform = T.Compose([
-    T.Resize((224, 224)),
-    T.ToTensor(),
-    T.Normalize(mean=[.485, .456, .406], std=[.229, .224, .225]),
-])
+# ─── MESURE DU DÉMARRAGE À FROID ──────────────────────────────
+def process_start_time():
+    """Horodatage de démarrage du processus (Linux : /proc), sinon instant d'import."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return time.time()
+
+process_started_at = process_start_time()
+first_predict_s = None
+
+# ─── CACHE DISQUE DES ARTEFACTS ───────────────────────────────
+artifact_cache = None
+if model_cache_dir:
+    artifact_cache = ModelArtifactCache(model_cache_dir, mode=model_cache_mode, verify=model_cache_verify)
+
+# ─── EXÉCUTION HORS BOUCLE D'ÉVÉNEMENTS ───────────────────────
+executor = InferenceExecutor(
+    kind=inference_executor,
+    workers=inference_workers,
+    torch_threads=torch_num_threads,
+    backend=inference_backend,
+    cache=artifact_cache,
+)
+
+# ─── GESTION DU MODÈLE ────────────────────────────────────────
+# Le modèle est chargé et préchauffé en arrière-plan au démarrage (/ready
+# renvoie 503 d'ici là), puis rechargé à chaud à chaque promotion.
+if not warmup_batch_sizes:
+    # Puissances de deux jusqu'à la taille de lot maximale du micro-batcher
+    warmup_batch_sizes = [1 << i for i in range(batch_max_size.bit_length()) if 1 << i <= batch_max_size]
+    warmup_batch_sizes.append(batch_max_size)
+
+manager = ModelManager(
+    executor,
+    model_name=model_name,
+    model_stage=model_stage,
+    poll_interval=model_poll_interval,
+    cache=artifact_cache,
+    warmup_batch_sizes=warmup_batch_sizes,
+    warmup_iterations=warmup_iterations,
+)
+
+# ─── CACHE DE PRÉDICTIONS ─────────────────────────────────────
+cache = PredictionCache(
+    max_entries=cache_max_entries,
+    shared=build_shared_tier(cache_shared_url, ttl=cache_shared_ttl),
+)
+
+# ─── MICRO-BATCHING ────────────────────────────────────────────
+async def infer_batch(batch):
+    """Passe forward d'un lot sur la version active ; renvoie (sortie, version) par élément."""
+    async with manager.use() as loaded:
+        out = await loaded.handle.infer(batch)
+    return [(row, loaded.version) for row in out]
+
+batcher = MicroBatcher(
+    infer_batch,
+    max_batch_size=batch_max_size,
+    max_wait_ms=batch_max_wait_ms,
+    max_queue_size=batch_max_queue,
+)
 
 # ─── APPLICATION FASTAPI ──────────────────────────────────────
 app = FastAPI(title="Dandelion vs Grass")
 
+@app.on_event("startup")
+async def startup():
+    executor.start()
+    await batcher.start()
+    manager.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await batcher.stop()
+    await manager.stop()
+    executor.shutdown()
+
+def ensure_ready():
+    """Refuse les prédictions tant que le modèle n'est pas chargé et préchauffé."""
+    if not manager.ready:
+        raise HTTPException(status_code=503, detail="Modèle en cours de chargement")
+
+async def score_image(data):
+    """
+    Bytes -> (label, version du modèle) : consulte le cache, sinon décode dans
+    l'exécuteur et passe par le micro-batcher. Lève ValueError si l'image est invalide.
+    """
+    digest = None
+    if cache.enabled:
+        digest = await cache.digest(data)
+        version = manager.active.version
+        label = await cache.get(cache.key(version, digest))
+        if label is not None:
+            return label, version
+
+    # Lecture et prétraitement de l’image (dans le pool de l'exécuteur)
+    try:
+        x = await executor.preprocess(data)
+    except Exception as e:
+        raise ValueError("Image invalide") from e
+
+    # Inference (regroupée en micro-lots avec les requêtes concurrentes)
+    out, version = await batcher.submit(x)
+    label = LABELS[out.argmax().item()]
+    if digest is not None:
+        await cache.set(cache.key(version, digest), label)
+    return label, version
+
 @app.post("/predict")
 async def predict(file: bytes = File(...)):
     """
     Endpoint pour la prédiction : reçoit une image en bytes,
     effectue le prétraitement, l'inférence et renvoie le label.
     """
-    # Lecture de l’image
+    global first_predict_s
+    ensure_ready()
     try:
-        img = Image.open(io.BytesIO(file)).convert("RGB")
-        logger.debug("Image reçue et convertie en RGB")
-    except Exception as e:
+        label, version = await score_image(file)
+        logger.info(f"Prédiction réalisée : {label} (modèle v{version})")
+        if first_predict_s is None:
+            first_predict_s = time.time() - process_started_at
+            logger.info(f"Première prédiction {first_predict_s:.2f}s après le démarrage du processus")
+    except ValueError as e:
         logger.error("Erreur de lecture de l'image", exc_info=e)
         raise HTTPException(status_code=400, detail="Image invalide")
-
-    # Prétraitement
-    x = transform(img).unsqueeze(0)
-    logger.debug("Prétraitement de l'image terminé")
-
-    # Inference
-    try:
-        with torch.no_grad():
-            out = model(x)
-        label = "dandelion" if out.argmax(1).item() == 0 else "grass"
-        logger.info(f"Prédiction réalisée : {label}")
     except Exception as e:
         logger.error("Erreur interne lors de l'inférence", exc_info=e)
         raise HTTPException(status_code=500, detail="Erreur interne lors de l'inférence")
 
-    return JSONResponse({"prediction": label})
+    return JSONResponse({"prediction": label, "model_version": version})
+
+async def predict_chunk(items):
+    """
+    Décode en parallèle un lot de (nom, bytes), exécute une passe forward unique
+    sur les images valides et renvoie un résultat par élément. Les entrées
+    d'archive illisibles (UnreadableMember) sont rapportées en erreur.
+    """
+    results = [{"filename": name} for name, _ in items]
+    readable = []
+    for i, (name, data) in enumerate(items):
+        if isinstance(data, UnreadableMember):
+            logger.warning(f"Entrée d'archive illisible dans le lot : {name} ({data})")
+            results[i]["error"] = "Entrée d'archive illisible"
+        else:
+            readable.append(i)
+
+    # Les images déjà connues du cache ne sont ni décodées ni inférées
+    digests = [None] * len(items)
+    pending = readable
+    if cache.enabled:
+        pending = []
+        version = manager.active.version
+        for i in readable:
+            digests[i] = await cache.digest(items[i][1])
+            label = await cache.get(cache.key(version, digests[i]))
+            if label is not None:
+                results[i]["prediction"] = label
+                results[i]["model_version"] = version
+            else:
+                pending.append(i)
+
+    decoded = dict(zip(pending, await asyncio.gather(
+        *(executor.preprocess(items[i][1]) for i in pending), return_exceptions=True
+    )))
+    valid = []
+    for i, x in decoded.items():
+        if isinstance(x, Exception):
+            logger.warning(f"Image invalide dans le lot : {items[i][0]} ({x})")
+            results[i]["error"] = "Image invalide"
+        else:
+            valid.append(i)
+
+    if valid:
+        try:
+            async with manager.use() as loaded:
+                out = await loaded.handle.infer(torch.stack([decoded[i] for i in valid]))
+            for row, i in enumerate(valid):
+                results[i]["prediction"] = LABELS[out[row].argmax().item()]
+                results[i]["model_version"] = loaded.version
+                if digests[i] is not None:
+                    await cache.set(cache.key(loaded.version, digests[i]), results[i]["prediction"])
+        except Exception as e:
+            logger.error("Erreur interne lors de l'inférence d'un lot", exc_info=e)
+            for i in valid:
+                results[i]["error"] = "Erreur interne lors de l'inférence"
+    return results
+
+@app.post("/predict/batch")
+async def predict_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+):
+    """
+    Prédiction par lot : reçoit N fichiers (`files`) et/ou une archive zip/tar
+    (`archive`), traite les images par paquets de `BATCH_MAX_SIZE` et renvoie
+    une prédiction ou une erreur par élément.
+
+    Limites vérifiées avant lecture : PREDICT_BATCH_MAX_ITEMS images et
+    PREDICT_BATCH_MAX_BYTES octets au total (fichiers, archive et images
+    décompressées, d'après les tailles déclarées par l'archive).
+    """
+    ensure_ready()
+    files = files or []
+    if len(files) > predict_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop d'images ({len(files)} > {predict_batch_max_items})",
+        )
+
+    budget = predict_batch_max_bytes
+
+    async def read_within_budget(upload):
+        # Au plus budget + 1 octets : un fichier trop gros n'est jamais chargé en entier
+        nonlocal budget
+        data = await upload.read(budget + 1)
+        budget -= len(data)
+        if budget < 0:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Requête trop volumineuse (> {predict_batch_max_bytes} octets)",
+            )
+        return data
+
+    items = []
+    for f in files:
+        items.append((f.filename, await read_within_budget(f)))
+    if archive is not None:
+        data = await read_within_budget(archive)
+        try:
+            items.extend(await asyncio.to_thread(
+                lambda: list(iter_archive(
+                    data, max_items=predict_batch_max_items - len(items),
+                    max_members=predict_batch_max_archive_members,
+                    max_bytes=budget,
+                ))
+            ))
+        except ValueError as e:
+            logger.error("Archive invalide", exc_info=e)
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if not items:
+        raise HTTPException(status_code=400, detail="Aucune image fournie")
+    if len(items) > predict_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop d'images ({len(items)} > {predict_batch_max_items})",
+        )
+
+    results = []
+    for start in range(0, len(items), batch_max_size):
+        results.extend(await predict_chunk(items[start:start + batch_max_size]))
+    for i, r in enumerate(results):
+        r["index"] = i
+
+    errors = sum(1 for r in results if "error" in r)
+    logger.info(f"Prédiction par lot réalisée : {len(results)} images, {errors} erreurs")
+    return JSONResponse({"count": len(results), "errors": errors, "predictions": results})
+
+class S3StreamRequest(BaseModel):
+    keys: List[str]
+    bucket: Optional[str] = None
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """
+    Prédiction en flux : le corps (chunked) est une suite d'images, chacune
+    précédée de sa taille sur 4 octets big-endian. Renvoie une ligne NDJSON
+    par image dès qu'elle est scorée, puis une ligne de synthèse.
+    """
+    ensure_ready()
+    async def source():
+        async for data in iter_frames(request.stream(), stream_max_frame_bytes):
+            async def load(data=data):
+                return data
+            yield None, load
+
+    # Le corps est lu par le générateur de la réponse : pas d'écoute concurrente de receive()
+    return DuplexStreamingResponse(
+        stream_predictions(source(), score_image, stream_max_in_flight),
+        media_type="application/x-ndjson",
+    )
+
+@app.post("/predict/stream/s3")
+async def predict_stream_s3(req: S3StreamRequest):
+    """
+    Prédiction en flux à partir de clés S3 (par défaut dans le bucket Minio
+    `images` alimenté par download_and_upload_pictures.py). Seuls BUCKET_NAME
+    et les buckets de STREAM_S3_ALLOWED_BUCKETS sont acceptés (400 sinon).
+    """
+    ensure_ready()
+    bucket = req.bucket or images_bucket
+    if bucket not in stream_s3_allowed_buckets:
+        raise HTTPException(status_code=400, detail=f"Bucket non autorisé : {bucket}")
+
+    async def source():
+        for key in req.keys:
+            async def load(key=key):
+                return await read_s3_object(bucket, key)
+            yield key, load
+
+    return StreamingResponse(
+        stream_predictions(source(), score_image, stream_max_in_flight),
+        media_type="application/x-ndjson",
+    )
+
+@app.get("/metrics")
+def metrics():
+    """Métriques du micro-batcher, du cache de prédictions et de l'exécuteur."""
+    return {
+        "model_version": manager.active.version if manager.active else None,
+        "backend": inference_backend,
+        "batching": batcher.metrics(),
+        "cache": cache.metrics(),
+        "cold_start": {
+            "model_ready_s": manager.ready_at - process_started_at if manager.ready_at else None,
+            "first_predict_s": first_predict_s,
+        },
+        "executor": {
+            "kind": executor.kind,
+            "workers": executor.workers,
+            "torch_threads": executor.torch_threads,
+        },
+    }
+
+@app.get("/model")
+def model_info():
+    """Version active du modèle, versions en cours de drainage et état de la surveillance."""
+    return manager.describe()
+
+@app.get("/live")
+def live():
+    """Liveness : le processus et la boucle d'événements répondent."""
+    return {"status": "alive"}
+
+@app.get("/ready")
+def ready():
+    """Readiness : modèle chargé et préchauffé ; 503 sinon (aucun trafic envoyé au pod)."""
+    if not manager.ready:
+        return JSONResponse(
+            {"status": "loading", "last_error": manager.last_error},
+            status_code=503,
+        )
+    return {
+        "status": "ready",
+        "model_version": manager.active.version,
+        "warmup": manager.active.warmup,
+        "load_s": manager.active.load_s,
+    }
 
 @app.get("/health")
 def health():
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+IMG_SHAPE = (3, 224, 224)
+
+
+class LoadedModel:
+    """Une version du modèle chargée, avec le nombre de requêtes qui l'utilisent."""
+
+    def __init__(self, version, uri, handle, load_s=None, warmup=None):
+        self.version = version
+        self.uri = uri
+        self.handle = handle
+        self.loaded_at = time.time()
+        self.load_s = load_s
+        self.warmup = warmup or {}
+        self.in_flight = 0
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "uri": self.uri,
+            "loaded_at": self.loaded_at,
+            "load_s": self.load_s,
+            "warmup": self.warmup,
+            "in_flight": self.in_flight,
+        }
+
+
+class ModelManager:
+    """
+    Gestionnaire de modèle à rechargement à chaud.
+
+    Chaque version est préchauffée avant d'être servie : des lots synthétiques
+    de chaque taille de `warmup_batch_sizes` traversent le modèle
+    `warmup_iterations` fois (sélection des noyaux oneDNN, croissance de
+    l'allocateur, profilage JIT du modèle scripté). `ready` ne devient vrai
+    qu'une fois la première version chargée et préchauffée.
+
+    Une tâche de fond interroge le Model Registry MLflow toutes les
+    `poll_interval` secondes. Quand une nouvelle version passe au stage
+    surveillé, elle est chargée et préchauffée en arrière-plan, puis remplace
+    atomiquement la version active. L'ancienne version reste résidente tant
+    que des requêtes l'utilisent encore, puis est libérée.
+    """
+
+    def __init__(self, executor, model_name, model_stage, poll_interval=60.0, cache=None,
+                 warmup_batch_sizes=(1,), warmup_iterations=3, retry_interval=10.0):
+        self.executor = executor
+        self.cache = cache
+        self.model_name = model_name
+        self.model_stage = model_stage
+        self.poll_interval = poll_interval
+        self.warmup_batch_sizes = sorted(set(warmup_batch_sizes))
+        self.warmup_iterations = warmup_iterations
+        self.retry_interval = retry_interval
+
+        self.active = None
+        self._draining = []
+        self._starter = None
+        self._poller = None
+        self._swap_lock = None
+
+        self.ready_at = None
+        self.swaps_total = 0
+        self.last_poll = None
+        self.last_error = None
+
+    # ─── REGISTRY ─────────────────────────────────────────────
+    def _registry_version(self):
+        from mlflow.tracking import MlflowClient
+
+        versions = MlflowClient().get_latest_versions(self.model_name, stages=[self.model_stage])
+        return str(versions[0].version) if versions else None
+
+    def resolve_version(self, allow_cache=False):
+        """
+        Numéro de la version actuellement au stage surveillé (None si aucune).
+        Avec `allow_cache`, la dernière version connue du cache disque est
+        utilisée si le registry est injoignable (démarrage hors ligne).
+        """
+        if allow_cache and self.cache is not None:
+            return self.cache.resolve_version(self.model_name, self.model_stage, self._registry_version)
+        return self._registry_version()
+
+    def uri_for(self, version):
+        return f"models:/{self.model_name}/{version}"
+
+    # ─── CHARGEMENT ───────────────────────────────────────────
+    async def _warmup(self, handle):
+        """Lots synthétiques à chaque taille configurée ; renvoie les durées (ms) par taille."""
+        # En mode process, autant d'appels concurrents que de workers pour tous les solliciter
+        parallel = self.executor.workers if self.executor.kind == "process" else 1
+        report = {}
+        for size in self.warmup_batch_sizes:
+            x = torch.randn(size, *IMG_SHAPE)
+            timings = []
+            for _ in range(self.warmup_iterations):
+                started = time.perf_counter()
+                await asyncio.gather(*(handle.infer(x) for _ in range(parallel)))
+                timings.append((time.perf_counter() - started) * 1000)
+            report[str(size)] = {"first_ms": timings[0], "last_ms": timings[-1]}
+        return report
+
+    async def _load(self, version):
+        uri = self.uri_for(version)
+        started = time.perf_counter()
+        handle = await self.executor.load(uri)
+        load_s = time.perf_counter() - started
+        try:
+            warmup = await self._warmup(handle)
+        except Exception:
+            handle.close()
+            raise
+        logger.info(
+            f"Version {version} chargée en {load_s:.1f}s et préchauffée en "
+            f"{time.perf_counter() - started - load_s:.1f}s (tailles de lot : {self.warmup_batch_sizes})"
+        )
+        return LoadedModel(version, uri, handle, load_s=load_s, warmup=warmup)
+
+    @property
+    def ready(self):
+        return self.active is not None
+
+    async def _start(self):
+        while True:
+            try:
+                version = await asyncio.to_thread(self.resolve_version, True)
+                if version is None:
+                    raise RuntimeError(f"Aucune version '{self.model_stage}' pour le modèle '{self.model_name}'")
+                self.active = await self._load(version)
+                self.ready_at = time.time()
+                self.last_error = None
+                break
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(
+                    f"Chargement initial du modèle impossible, nouvel essai dans {self.retry_interval:.0f}s",
+                    exc_info=e,
+                )
+                await asyncio.sleep(self.retry_interval)
+        if self.poll_interval > 0:
+            self._poller = asyncio.create_task(self._poll())
+
+    def start(self):
+        """
+        Lance en arrière-plan le chargement et le préchauffage de la version
+        courante (réessayé jusqu'au succès), puis la surveillance du registry.
+        """
+        self._swap_lock = asyncio.Lock()
+        self._starter = asyncio.create_task(self._start())
+
+    async def stop(self):
+        for task in (self._starter, self._poller):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._starter = self._poller = None
+        for loaded in self._draining + ([self.active] if self.active else []):
+            loaded.handle.close()
+        self._draining = []
+        self.active = None
+
+    async def swap(self, version):
+        """Charge `version` en arrière-plan puis la rend active sans interrompre les requêtes en cours."""
+        async with self._swap_lock:
+            if self.active is not None and self.active.version == version:
+                return
+            new = await self._load(version)
+            old, self.active = self.active, new
+            self.swaps_total += 1
+            logger.info(f"Modèle actif : version {old.version if old else None} -> {version}")
+            if old is not None:
+                self._draining.append(old)
+                self._reap()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if self.cache is not None and self.cache.mode == "offline":
+                    continue
+                version = await asyncio.to_thread(self.resolve_version)
+                self.last_poll = time.time()
+                self.last_error = None
+                if version is not None and version != self.active.version:
+                    logger.info(f"Nouvelle version {version} détectée au stage '{self.model_stage}'")
+                    await self.swap(version)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Erreur lors de la surveillance du Model Registry", exc_info=e)
+
+    # ─── UTILISATION ──────────────────────────────────────────
+    @asynccontextmanager
+    async def use(self):
+        """Réserve la version active le temps d'une inférence."""
+        loaded = self.active
+        if loaded is None:
+            raise RuntimeError("Aucun modèle chargé")
+        loaded.in_flight += 1
+        try:
+            yield loaded
+        finally:
+            loaded.in_flight -= 1
+            if loaded is not self.active:
+                self._reap()
+
+    def _reap(self):
+        """Libère les anciennes versions qui n'ont plus de requêtes en cours."""
+        for loaded in list(self._draining):
+            if loaded.in_flight == 0:
+                loaded.handle.close()
+                self._draining.remove(loaded)
+                logger.info(f"Version {loaded.version} drainée et libérée")
+
+    def describe(self):
+        return {
+            "ready": self.ready,
+            "name": self.model_name,
+            "stage": self.model_stage,
+            "backend": self.executor.backend,
+            "active": self.active.describe() if self.active else None,
+            "draining": [loaded.describe() for loaded in self._draining],
+            "swaps_total": self.swaps_total,
+            "poll_interval": self.poll_interval,
+            "last_poll": self.last_poll,
+            "last_error": self.last_error,
+            "artifact_cache": self.cache.metrics() if self.cache else None,
+        }
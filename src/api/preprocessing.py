@@ -0,0 +1,70 @@
+import io
+import os
+
+import numpy as np
+from PIL import Image
+import torch
+import torchvision.transforms as T
+
+IMG_SIZE = (224, 224)
+MEAN = (.485, .456, .406)
+STD = (.229, .224, .225)
+
+# "reference" : transform torchvision (entrées identiques à l'entraînement) ;
+# "fast" : décodage JPEG réduit + normalisation fusionnée, à valider d'abord avec
+# benchmarks/preprocessing.py --model (écart max et accord top-1 avec "reference")
+PREPROCESS_MODE = os.getenv("PREPROCESS_MODE", "reference")
+
+# ─── PRÉTRAITEMENT DE RÉFÉRENCE ────────────────────────────────
+transform = T.Compose([
+    T.Resize(IMG_SIZE),
+    T.ToTensor(),
+    T.Normalize(mean=list(MEAN), std=list(STD)),
+])
+
+# ─── PRÉTRAITEMENT RAPIDE ──────────────────────────────────────
+# (x / 255 - mean) / std  ==  x * scale - shift, appliqué en une seule opération
+_SCALE = (1.0 / (255.0 * torch.tensor(STD))).view(3, 1, 1)
+_SHIFT = (torch.tensor(MEAN) / torch.tensor(STD)).view(3, 1, 1)
+
+
+def decode_image(data):
+    """Décode des bytes d'image en PIL RGB pleine résolution (lève une exception si invalide)."""
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+def decode_image_reduced(data, size=IMG_SIZE):
+    """
+    Décode des bytes d'image en PIL RGB en laissant libjpeg réduire l'image
+    (1/2, 1/4 ou 1/8) au plus petit facteur qui reste >= `size`.
+    Sans effet pour les formats autres que JPEG.
+    """
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        img.draft("RGB", size)
+    return img.convert("RGB")
+
+
+def to_normalized_tensor(img, size=IMG_SIZE):
+    """PIL RGB -> redimensionnement en uint8 -> tenseur float (3, H, W) normalisé."""
+    if img.size != size:
+        img = img.resize(size, Image.BILINEAR)
+    x = torch.from_numpy(np.asarray(img).copy()).permute(2, 0, 1)
+    return torch.addcmul(-_SHIFT, x.float(), _SCALE)
+
+
+def preprocess_reference(data):
+    """Bytes bruts -> tenseur normalisé (3, 224, 224), chemin torchvision d'origine."""
+    return transform(decode_image(data))
+
+
+def preprocess_fast(data):
+    """Bytes bruts -> tenseur normalisé (3, 224, 224), décodage réduit et normalisation fusionnée."""
+    return to_normalized_tensor(decode_image_reduced(data))
+
+
+def preprocess(data):
+    """Bytes bruts -> tenseur normalisé (3, 224, 224) selon PREPROCESS_MODE."""
+    if PREPROCESS_MODE == "fast":
+        return preprocess_fast(data)
+    return preprocess_reference(data)
@@ -0,0 +1,151 @@
+import os
+import json
+import asyncio
+import logging
+
+from starlette.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER_BYTES = 4
+
+_s3_client = None
+
+
+# ─── SOURCES ──────────────────────────────────────────────────
+async def iter_frames(stream, max_frame_bytes):
+    """
+    Découpe un corps de requête (itérateur asynchrone de chunks) en images.
+    Chaque image est précédée de sa taille sur 4 octets big-endian.
+    """
+    buf = bytearray()
+    async for chunk in stream:
+        buf += chunk
+        while len(buf) >= FRAME_HEADER_BYTES:
+            size = int.from_bytes(buf[:FRAME_HEADER_BYTES], "big")
+            if size > max_frame_bytes:
+                raise ValueError(f"Trame trop volumineuse ({size} > {max_frame_bytes} octets)")
+            end = FRAME_HEADER_BYTES + size
+            if len(buf) < end:
+                break
+            yield bytes(buf[FRAME_HEADER_BYTES:end])
+            del buf[:end]
+    if buf:
+        raise ValueError("Trame incomplète en fin de flux")
+
+
+def get_s3_client():
+    """Client boto3 vers Minio/S3, créé à la première utilisation."""
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        from botocore.client import Config
+
+        _s3_client = boto3.client(
+            's3',
+            endpoint_url=os.getenv("MLFLOW_S3_ENDPOINT_URL"),
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            config=Config(signature_version='s3v4'),
+            region_name=os.getenv("AWS_REGION", "us-east-1")
+        )
+        logger.info("Client S3 initialisé")
+    return _s3_client
+
+
+async def read_s3_object(bucket, key):
+    """Télécharge un objet S3 dans un thread, sans bloquer la boucle d'événements."""
+    def _read():
+        return get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+    return await asyncio.to_thread(_read)
+
+
+# ─── PIPELINE ─────────────────────────────────────────────────
+async def stream_predictions(source, score, max_in_flight):
+    """
+    Score les éléments de `source` (itérateur asynchrone de (nom, chargeur))
+    et produit une ligne NDJSON par image dès qu'elle est scorée.
+
+    `chargeur` est une coroutine sans argument renvoyant les bytes de l'image ;
+    `score` une coroutine bytes -> (label, version du modèle). Au plus `max_in_flight` images sont
+    en mémoire (en chargement, en inférence ou en attente d'envoi) : au-delà,
+    la lecture de la source est suspendue, ce qui propage la contre-pression
+    au client comme au consommateur de la réponse.
+    """
+    slots = asyncio.Semaphore(max_in_flight)
+    results = asyncio.Queue()
+    tasks = set()
+
+    async def run_one(index, name, load):
+        record = {"index": index}
+        if name is not None:
+            record["name"] = name
+        try:
+            data = await load()
+        except Exception as e:
+            logger.warning(f"Impossible de lire '{name}' ({e})")
+            record["error"] = "Image introuvable"
+            await results.put(record)
+            return
+        try:
+            record["prediction"], record["model_version"] = await score(data)
+        except ValueError:
+            record["error"] = "Image invalide"
+        except Exception as e:
+            logger.error(f"Erreur lors du scoring de '{name}'", exc_info=e)
+            record["error"] = "Erreur interne lors de l'inférence"
+        await results.put(record)
+
+    async def produce():
+        index = 0
+        try:
+            async for name, load in source:
+                await slots.acquire()
+                task = asyncio.create_task(run_one(index, name, load))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+        except Exception as e:
+            logger.error("Erreur de lecture du flux d'entrée", exc_info=e)
+            await results.put({"error": f"Flux d'entrée invalide : {e}"})
+        if tasks:
+            await asyncio.gather(*list(tasks))
+        await results.put(None)
+
+    producer = asyncio.create_task(produce())
+    count = errors = 0
+    try:
+        while True:
+            record = await results.get()
+            if record is None:
+                break
+            if "index" in record:
+                slots.release()
+                count += 1
+            if "error" in record:
+                errors += 1
+            yield json.dumps(record) + "\n"
+        yield json.dumps({"done": True, "count": count, "errors": errors}) + "\n"
+    finally:
+        # Client déconnecté : on abandonne le travail restant
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+# ─── RÉPONSE ──────────────────────────────────────────────────
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse dont le générateur lit encore le corps de la requête.
+
+    Sous ASGI < 2.4, StreamingResponse surveille la déconnexion en appelant
+    receive() en parallèle du générateur : cette tâche consomme aussi les
+    messages http.request, et des chunks du corps sont perdus. Ici seul le
+    générateur lit la requête ; une déconnexion lui parvient par
+    request.stream() (ClientDisconnect), ce qui termine la réponse.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
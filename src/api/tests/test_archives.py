@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+import tarfile
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archives import UnreadableMember, iter_archive
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def make_tar(members, mode="w:gz"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("make", [make_zip, make_tar])
+def test_images_only(make):
+    data = make({"a.jpg": b"1", "notes.txt": b"2", "dir/b.PNG": b"3", ".hidden.jpg": b"4"})
+    assert list(iter_archive(data)) == [("a.jpg", b"1"), ("dir/b.PNG", b"3")]
+
+
+@pytest.mark.parametrize("make", [make_zip, make_tar])
+def test_decompressed_size_budget(make):
+    # Très compressible : la limite porte sur la taille décompressée déclarée
+    data = make({"a.jpg": b"\0" * 600, "b.jpg": b"\0" * 600})
+    assert len(list(iter_archive(data, max_bytes=1200))) == 2
+    with pytest.raises(ValueError, match="octets décompressés"):
+        list(iter_archive(data, max_bytes=1199))
+
+
+@pytest.mark.parametrize("make", [make_zip, make_tar])
+def test_member_and_item_limits(make):
+    data = make({f"{i}.jpg": b"x" for i in range(5)})
+    with pytest.raises(ValueError, match="entrées"):
+        list(iter_archive(data, max_members=4))
+    with pytest.raises(ValueError, match="images"):
+        list(iter_archive(data, max_items=4))
+
+
+def test_corrupt_zip_member_is_reported_per_item():
+    data = bytearray(make_zip({"a.jpg": b"a" * 1000, "b.jpg": b"b" * 1000}))
+    # Corrompt les données compressées de la première entrée (après son en-tête local)
+    start = 30 + len("a.jpg")
+    data[start:start + 4] = b"\xff\xff\xff\xff"
+    items = list(iter_archive(bytes(data)))
+    assert isinstance(items[0][1], UnreadableMember)
+    assert items[1] == ("b.jpg", b"b" * 1000)
+
+
+def test_unreadable_archive():
+    with pytest.raises(ValueError, match="Archive illisible"):
+        list(iter_archive(b"not an archive at all"))
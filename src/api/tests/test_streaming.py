@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+
+from streaming import DuplexStreamingResponse, iter_frames, stream_predictions
+
+FRAMES = [bytes([i]) * (1000 + 37 * i) for i in range(50)]
+
+
+def encode(frames):
+    return b"".join(len(f).to_bytes(4, "big") + f for f in frames)
+
+
+async def from_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect_frames(chunks, max_frame_bytes=1 << 20):
+    async def run():
+        return [f async for f in iter_frames(from_chunks(chunks), max_frame_bytes)]
+    return asyncio.run(run())
+
+# ─── iter_frames ──────────────────────────────────────────────
+def test_frames_cut_at_awkward_offsets():
+    frames = [b"abc", b"", b"x" * 10, b"yz"]
+    body = encode(frames)
+    # Coupures : dans le préfixe de taille, à cheval sur deux trames, chunks vides
+    chunks = [b"", body[:2], body[2:4], b"", body[4:6], body[6:9], body[9:20], b"", body[20:], b""]
+    assert b"".join(chunks) == body
+    assert collect_frames(chunks) == frames
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 5, 777])
+def test_frames_any_chunk_size(chunk_size):
+    body = encode(FRAMES)
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    assert collect_frames(chunks) == FRAMES
+
+
+def test_oversized_frame_is_rejected():
+    body = encode([b"ok", b"z" * 11])
+    with pytest.raises(ValueError, match="Trame trop volumineuse"):
+        collect_frames([body[:3], body[3:]], max_frame_bytes=10)
+
+
+def test_truncated_frame_is_rejected():
+    body = encode([b"abcdef"])
+    with pytest.raises(ValueError, match="Trame incomplète"):
+        collect_frames([body[:-1]])
+
+# ─── Réponse : corps reçu en plusieurs messages http.request ──
+def make_app():
+    """Même pipeline que /predict/stream, avec un scoring factice (taille de l'image)."""
+    app = FastAPI()
+
+    async def score(data):
+        return str(len(data)), "test"
+
+    @app.post("/stream")
+    async def stream(request: Request):
+        async def source():
+            async for data in iter_frames(request.stream(), 1 << 20):
+                async def load(data=data):
+                    return data
+                yield None, load
+
+        return DuplexStreamingResponse(
+            stream_predictions(source(), score, 8), media_type="application/x-ndjson"
+        )
+
+    return app
+
+
+def test_multi_message_body_yields_one_result_per_frame():
+    # Appel ASGI direct : le TestClient enverrait le corps en un seul message
+    body = encode(FRAMES)
+    messages = [
+        {"type": "http.request", "body": body[i:i + 777], "more_body": i + 777 < len(body)}
+        for i in range(0, len(body), 777)
+    ]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/stream", "raw_path": b"/stream",
+        "query_string": b"", "root_path": "", "headers": [(b"transfer-encoding", b"chunked")],
+        "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 80),
+    }
+    sent = []
+
+    async def run():
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()  # corps terminé : rien avant la déconnexion
+
+        async def send(message):
+            sent.append(message)
+
+        await asyncio.wait_for(make_app()(scope, receive, send), timeout=10)
+
+    asyncio.run(run())
+    text = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body").decode()
+    lines = [json.loads(line) for line in text.splitlines()]
+    results = sorted((r for r in lines if "index" in r), key=lambda r: r["index"])
+    assert [r["prediction"] for r in results] == [str(len(f)) for f in FRAMES]
+    assert lines[-1] == {"done": True, "count": len(FRAMES), "errors": 0}